@@ -31,114 +31,134 @@ def flatten_sections(
     region_map: Dict[str, Tuple[int, int]] = {}
 
     stack: List[int] = []          # keeps section numbers per level
+    prefixes: List[str] = []       # sec_id of the open section per level
 
-    def visit(node: Dict, level: int):
-        # grow / trim stack to current depth
-        if len(stack) < level + 1:
+    # explicit DFS stack instead of recursion; reversed so pops keep document order
+    work: List[Tuple[Dict, int]] = [(top, 0) for top in reversed(hierarchy)]
+    while work:
+        node, level = work.pop()
+
+        # grow / trim stack to current depth (DFS only ever descends one level at a time)
+        if len(stack) <= level:
             stack.append(0)
+        else:
+            del stack[level + 1:]
         stack[level] += 1
-        while len(stack) > level + 1:
-            stack.pop()
 
-        # build sec_id like 2.3.1 …
-        sec_id = ".".join(map(str, stack))
+        # build sec_id like 2.3.1 … from the parent's sec_id
+        sec_id = f"{prefixes[level - 1]}.{stack[level]}" if level else str(stack[level])
+        del prefixes[level:]
+        prefixes.append(sec_id)
         flat.append({"sec_id": sec_id, "title": node["title"]})
         region_map[sec_id] = node["region"]
 
-        for child in node["subsections"]:
-            visit(child, level + 1)
-
-    for top in hierarchy:
-        visit(top, 0)
+        work.extend((child, level + 1) for child in reversed(node["subsections"]))
 
     return flat, region_map
 
 
 # ──────────────────────────
-# 2)  Collect paragraphs  (order preserved)
+# 2)  Collect paragraphs, equations, figures & tables  (order preserved)
 # ──────────────────────────
-def collect_paragraphs(
+def collect_all(
     data: List[Dict],
-    sections_region: Dict[str, Tuple[int, int]]
-) -> Tuple[List[Dict], List[Dict]]:
+    sections_region: Dict[str, Tuple[int, int]],
+    body_end: int
+) -> Tuple[List[Dict], List[Dict], List[Dict], List[Dict]]:
     """
+    Single pass over data.
     Returns
       • flat list of paragraph dicts
       • flat list of equation dicts (equations extracted from paragraphs)
+      • flat list of figure dicts  (simple counters, up to body_end)
+      • flat list of table dicts   (simple counters, up to body_end)
     """
     para_list: List[Dict] = []
     eq_list:   List[Dict] = []
+    figs:      List[Dict] = []
+    tabs:      List[Dict] = []
 
+    # owner[idx] → sec_id whose region covers data[idx]; regions are visited
+    # depth-first, so a subsection overwrites the tail of its parent's region
+    owner: List[Any] = [None] * len(data)
+    scan_end = body_end
     for sec_id, (r_start, r_end) in sections_region.items():
-        p_count = 1
-        eq_cnt = 0
-        for idx in range(r_start + 1, r_end + 1):
-            it = data[idx]
-            if it.get("text_level") == 1:      # defensive: stop at next header
-                break
-
-            typ = it.get("type", "")
-
-            if typ.startswith("text"):
-                txt = it.get("text", "").strip()
-                if not txt:
-                    continue
-                para_id = f"{sec_id}_p{p_count}"
-                para_list.append(
-                    {"para_id": para_id, "sec_id": sec_id, "text": txt}
-                )
-                last_para_id = para_id
-                p_count += 1
+        owner[r_start + 1:r_end + 1] = [sec_id] * (r_end - r_start)
+        scan_end = max(scan_end, r_end + 1)
 
-            elif typ.startswith("equation") and last_para_id:
-                latex = it.get("text", "").strip()
-                if latex:
-                    eq_id = f"{last_para_id}_eq{eq_cnt}"
-                    eq_list.append(
-                        {"eq_id": eq_id, "para_id": last_para_id, "raw_latex": latex}
-                    )
-                    eq_cnt += 1
-
-    # keep original reading order
-    para_list.sort(key=lambda d: (
-        list(map(int, d["sec_id"].split("."))),   # sec 1 < 1.1 < 1.2 < 2 …
-        int(d["para_id"].split("_p")[-1])
-    ))
-    eq_list.sort(key=lambda e: e["eq_id"])
+    last_para_id = None
+    cur_sec = None
+    halted = False
+    p_count, eq_cnt = 1, 0
+    fig_c, tab_c = 0, 0
 
-    return para_list, eq_list
+    para_append, eq_append = para_list.append, eq_list.append
+    figs_append, tabs_append = figs.append, tabs.append
+
+    for idx, it in enumerate(data[:scan_end]):
+        get = it.get
+        typ = get("type", "")
+
+        if typ == "image":
+            if idx < body_end:
+                fig_c += 1
+                figs_append(
+                    {
+                        "fig_id":  f"fig{fig_c}",
+                        "caption": (get("img_caption") or ("",))[0]
+                    }
+                )
+            continue
+        if typ == "table":
+            if idx < body_end:
+                tab_c += 1
+                tabs_append(
+                    {
+                        "tab_id":  f"tab{tab_c}",
+                        "caption": (get("table_caption") or ("",))[0]
+                    }
+                )
+            continue
+
+        sec_id = owner[idx]
+        if sec_id is None:
+            continue
+        if sec_id != cur_sec:                  # entered the next section
+            cur_sec, halted = sec_id, False
+            p_count, eq_cnt = 1, 0
+        if halted:
+            continue
+        if get("text_level") == 1:             # defensive: stop at next header
+            halted = True
+            continue
+
+        if typ.startswith("text"):
+            txt = get("text", "").strip()
+            if not txt:
+                continue
+            para_id = f"{sec_id}_p{p_count}"
+            para_append(
+                {"para_id": para_id, "sec_id": sec_id, "text": txt}
+            )
+            last_para_id = para_id
+            p_count += 1
+
+        elif typ.startswith("equation") and last_para_id:
+            latex = get("text", "").strip()
+            if latex:
+                eq_id = f"{last_para_id}_eq{eq_cnt}"
+                eq_append(
+                    {"eq_id": eq_id, "para_id": last_para_id, "raw_latex": latex}
+                )
+                eq_cnt += 1
 
+    # single pass over data ⇒ everything is already in reading order
 
-# ──────────────────────────
-# 3)  Figures & tables  (simple counters)
-# ──────────────────────────
-def collect_figs_tables(data: List[Dict], end: int) -> Tuple[List[Dict], List[Dict]]:
-    figs, tabs = [], []
-    fig_c, tab_c = 0, 0
-    for i, it in enumerate(data):
-        t = it.get("type")
-        if i >= end: break
-        if t == "image":
-            fig_c += 1
-            figs.append(
-                {
-                    "fig_id":  f"fig{fig_c}",
-                    "caption": (it.get("img_caption") or [""])[0]
-                }
-            )
-        elif t == "table":
-            tab_c += 1
-            tabs.append(
-                {
-                    "tab_id":  f"tab{tab_c}",
-                    "caption": (it.get("table_caption") or [""])[0]
-                }
-            )
-    return figs, tabs
+    return para_list, eq_list, figs, tabs
 
 
 # ──────────────────────────
-# 4)  Master builder
+# 3)  Master builder
 # ──────────────────────────
 def build_flat_schema(
     data: List[Dict],
@@ -147,8 +167,7 @@ def build_flat_schema(
 ) -> Dict[str, Any]:
 
     sections, sec_region = flatten_sections(hierarchy, data)
-    paragraphs, equations = collect_paragraphs(data, sec_region)
-    figures, tables      = collect_figs_tables(data, body_end)
+    paragraphs, equations, figures, tables = collect_all(data, sec_region, body_end)
 
     return {
         "sections":   sections,
@@ -160,7 +179,7 @@ def build_flat_schema(
 
 
 # ──────────────────────────
-# 5)  Example driver
+# 4)  Example driver
 # ──────────────────────────
 if __name__ == "__main__":
     # (1) raw content + (2) nested hierarchy from parser #1
@@ -170,8 +189,9 @@ if __name__ == "__main__":
 
     raw_data   = load_json(RAW_PATH)
     filtered_data = clean_bad_entry(raw_data)
-    hierarchy  = hierarchical_parse(filtered_data)["hierarchy"]
-    body_end = hierarchical_parse(filtered_data)["body_end"]
+    parsed     = hierarchical_parse(filtered_data)
+    hierarchy  = parsed["hierarchy"]
+    body_end   = parsed["body_end"]
 
     flat = build_flat_schema(filtered_data, hierarchy, body_end)
     save_json(flat, OUT_PATH)
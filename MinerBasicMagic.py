@@ -1,5 +1,6 @@
 import os
-import time, json
+import time
+import orjson
 from typing import Any, List
 import logging
 from pathlib import Path
@@ -12,28 +13,44 @@ from mineru.backend.pipeline.pipeline_middle_json_mkcontent import union_make as
 from mineru.backend.pipeline.model_json_to_middle_json import result_to_middle_json as pipeline_result_to_middle_json
 
 
-def minermagic(pdf_file: str, out_dir: str, full_dump: bool = True) -> List[dict[str, Any]] | None:
+def minermagic(pdf_file: str, out_dir: str, full_dump: bool = True,
+               debug: bool = False, pretty: bool = False) -> List[dict[str, Any]] | None:
     """
     Run MinerU (pipeline backend) on a single PDF.
 
     - If full_dump is True: write <stem>_content_list.json (and images)
       under out_dir/<stem>/<parse_method>/, and return None.
+      The JSON is compact unless pretty is True; <stem>_middle.json is
+      only written (compact) when debug is True.
     - If full_dump is False: return the content_list as a Python list
       and still use MinerU's standard directory layout for images.
     """
-    pdf_path = Path(pdf_file).expanduser().resolve()
-    if not pdf_path.exists():
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
-    pdf_name = pdf_path.stem
+    return minermagic_many([pdf_file], out_dir, full_dump, debug, pretty)[0]
+
+
+def minermagic_many(pdf_files: List[str], out_dir: str, full_dump: bool = True,
+                    debug: bool = False, pretty: bool = False) -> List[List[dict[str, Any]] | None]:
+    """
+    Run MinerU (pipeline backend) on several PDFs in one doc_analyze call,
+    so the models are batched across documents instead of per PDF.
+
+    Same per-PDF output/return behaviour as minermagic; returns one entry
+    per input PDF, in input order.
+    """
+    pdf_paths = [Path(pdf_file).expanduser().resolve() for pdf_file in pdf_files]
+    for pdf_path in pdf_paths:
+        if not pdf_path.exists():
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
     out_root = Path(out_dir).expanduser().resolve()
     out_root.mkdir(parents=True, exist_ok=True)
+    out_root_str = str(out_root)
 
-    # 1) Read PDF bytes (handles images→PDF conversion if needed)
-    pdf_bytes = read_fn(pdf_path)
+    # 1) Read PDF bytes; read_fn is only needed for the images→PDF conversion
+    pdf_bytes_list = [pdf_path.read_bytes() if pdf_path.suffix.lower() == ".pdf" else read_fn(pdf_path)
+                      for pdf_path in pdf_paths]
 
-    # 2) Run pipeline backend for a single PDF
-    pdf_bytes_list = [pdf_bytes]
-    lang_list = ["en"]  # or [""] to let MinerU infer/guess
+    # 2) Run pipeline backend for all PDFs at once
+    lang_list = ["en"] * len(pdf_paths)  # or [""] to let MinerU infer/guess
     parse_method = "auto"
 
     (infer_results, all_image_lists,
@@ -42,53 +59,55 @@ def minermagic(pdf_file: str, out_dir: str, full_dump: bool = True) -> List[dict
                                                  parse_method=parse_method,formula_enable=True,
                                                  table_enable=True,)
 
-    # We only have one document: use index 0
-    model_list = infer_results[0]
-    images_list = all_image_lists[0]
-    pdf_doc = all_pdf_docs[0]
-    _lang = out_lang_list[0]
-    _ocr_enable = ocr_enabled_list[0]
-
-    # 3) Where to put images + JSON
-    local_image_dir, local_md_dir = prepare_env(str(out_root), pdf_name, parse_method)
-    image_writer = FileBasedDataWriter(local_image_dir)
-    md_writer = FileBasedDataWriter(local_md_dir)
-
-    # 4) Convert model output → middle_json (successor of PipeResult internals)
-    middle_json = pipeline_result_to_middle_json(
-        model_list,
-        images_list,
-        pdf_doc,
-        image_writer,
-        _lang,
-        _ocr_enable,
-        True,
-    )
-    pdf_info = middle_json["pdf_info"]
-
-    # 5) Build content_list (successor of PipeResult.get_content_list)
-    image_dir_name = os.path.basename(local_image_dir)
-    content_list = pipeline_union_make(pdf_info, MakeMode.CONTENT_LIST, image_dir_name)
-
-    # 6) Dump / return
-    if full_dump:
-        # Write content_list.json similar to old behavior (different path layout)
-        md_writer.write_string(
-            f"{pdf_name}_content_list.json",
-            json.dumps(content_list, ensure_ascii=False, indent=4),
+    results = []
+    for idx, pdf_path in enumerate(pdf_paths):
+        pdf_name = pdf_path.stem
+        model_list = infer_results[idx]
+        images_list = all_image_lists[idx]
+        pdf_doc = all_pdf_docs[idx]
+        _lang = out_lang_list[idx]
+        _ocr_enable = ocr_enabled_list[idx]
+
+        # 3) Where to put images + JSON
+        local_image_dir, local_md_dir = prepare_env(out_root_str, pdf_name, parse_method)
+        image_writer = FileBasedDataWriter(local_image_dir)
+
+        # 4) Convert model output → middle_json (successor of PipeResult internals)
+        middle_json = pipeline_result_to_middle_json(
+            model_list,
+            images_list,
+            pdf_doc,
+            image_writer,
+            _lang,
+            _ocr_enable,
+            True,
         )
+        pdf_info = middle_json["pdf_info"]
 
-        # Optionally also dump middle_json for debugging:
-        md_writer.write_string(
-            f"{pdf_name}_middle.json",
-            json.dumps(middle_json, ensure_ascii=False, indent=4),
-        )
+        # 5) Build content_list (successor of PipeResult.get_content_list)
+        image_dir_name = os.path.basename(local_image_dir)
+        content_list = pipeline_union_make(pdf_info, MakeMode.CONTENT_LIST, image_dir_name)
+
+        # 6) Dump / return
+        if full_dump:
+            # Write content_list.json similar to old behavior (different path layout)
+            md_writer = FileBasedDataWriter(local_md_dir)
+            md_writer.write(
+                f"{pdf_name}_content_list.json",
+                orjson.dumps(content_list, option=orjson.OPT_INDENT_2 if pretty else None),
+            )
+
+            # middle_json is the largest structure by far: only dump it for debugging
+            if debug:
+                md_writer.write(f"{pdf_name}_middle.json", orjson.dumps(middle_json))
+
+            logging.info("MinerU pipeline finished for %s → %s", pdf_name, local_md_dir)
+            results.append(None)
+        else:
+            # Parser.py expects a Python list, not a file.
+            results.append(content_list)
 
-        logging.info("MinerU pipeline finished for %s → %s", pdf_name, local_md_dir)
-        return None
-    else:
-        # Parser.py expects a Python list, not a file.
-        return content_list
+    return results
 
 if __name__ == '__main__':
     logging.basicConfig(
@@ -97,10 +116,11 @@ if __name__ == '__main__':
         datefmt="%H:%M:%S"
     )
 
-    DocFolds = os.environ.get('DiffAmp')
-    pdf_path = os.path.join(DocFolds, '6H-SiC JFETs for 450 °C Differential Sensing Applications.pdf')
+    DocFolds = Path(os.environ.get('DiffAmp'))
+    pdf_path = DocFolds / '6H-SiC JFETs for 450 °C Differential Sensing Applications.pdf'
+    out_dir = pdf_path.parent / pdf_path.stem
     timers = time.perf_counter()
-    miner_contents = minermagic(pdf_path, f"{os.path.dirname(pdf_path)}/{Path(pdf_path).stem}", True)
+    miner_contents = minermagic(str(pdf_path), str(out_dir), True)
 
     total_elapsed = time.perf_counter() - timers
     logging.info("Total processing time: %.2f seconds", total_elapsed)
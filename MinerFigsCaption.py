@@ -1,24 +1,54 @@
-import json
-import math
-import glob
-import os
+import ijson
+import numpy as np
 
-# Weighted distance function (column-aware)
-def weighted_bbox_distance(bbox1, bbox2, wx=50, wy=1):
-    x1 = (bbox1[0] + bbox1[2]) / 2
-    y1 = (bbox1[1] + bbox1[3]) / 2
-    x2 = (bbox2[0] + bbox2[2]) / 2
-    y2 = (bbox2[1] + bbox2[3]) / 2
-    return math.sqrt(wx * (x1 - x2)**2 + wy * (y1 - y2)**2)
+# Weighted squared distance function (column-aware) on bbox centres; arrays broadcast.
+# Only ever compared, so the (monotonic) square root is skipped, and centres may be
+# passed doubled (x0+x1, y0+y1): that scales every distance by 4 and keeps the argmin.
+def weighted_bbox_distance_sq(xc1, yc1, xc2, yc2, wx=50, wy=1):
+    return wx * (xc1 - xc2)**2 + wy * (yc1 - yc2)**2
+
+def _bbox_soa(items):
+    """Split bboxes into flat x0, doubled x-centre and doubled y-centre arrays."""
+    b = np.asarray([it['bbox'] for it in items], dtype=np.float64).reshape(-1, 4)
+    return b[:, 0], b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+
+def closest_pairs(captions, targets, wx, wy, left_of=False):
+    """
+    For every caption return the index of the closest target, or -1 if none qualifies.
+    All caption × target distances are computed in one broadcast.
+    With left_of=True a target only qualifies if its x0 lies left of the caption's x0.
+    """
+    if not captions or not targets:
+        return [-1] * len(captions)
+    cap_x0, cap_xc, cap_yc = _bbox_soa(captions)
+    tgt_x0, tgt_xc, tgt_yc = _bbox_soa(targets)
+    tgt_idx = np.arange(len(targets))
+    if left_of:
+        # cheap x0 test first: drop targets no caption can pair with before any distance work
+        ok = tgt_x0[None, :] < cap_x0[:, None]
+        keep = ok.any(axis=0)
+        if not keep.any():
+            return [-1] * len(captions)
+        tgt_xc, tgt_yc, ok, tgt_idx = tgt_xc[keep], tgt_yc[keep], ok[:, keep], tgt_idx[keep]
+    dist = weighted_bbox_distance_sq(cap_xc[:, None], cap_yc[:, None],
+                                     tgt_xc[None, :], tgt_yc[None, :], wx=wx, wy=wy)
+    if left_of:
+        dist = np.where(ok, dist, np.inf)
+    best = np.argmin(dist, axis=1)
+    return np.where(np.isfinite(dist[np.arange(len(captions)), best]), tgt_idx[best], -1).tolist()
 
 # Function to process a single file and extract image-caption and table-caption pairs
-def process_dict(middle_dict: list[dict]):
+def process_dict(middle_dict: dict):
+    return process_pages(middle_dict['pdf_info'])
+
+# Same as process_dict, but takes any iterable of pdf_info pages (e.g. streamed with ijson)
+def process_pages(pages):
     results = {
         'images': [],
         'tables': []
     }
 
-    for page in middle_dict['pdf_info']:
+    for page in pages:
         blocks = page.get('preproc_blocks', [])
 
         images = []
@@ -33,51 +63,38 @@ def process_dict(middle_dict: list[dict]):
                         image_path = b['lines'][0]['spans'][0]['image_path']
                         images.append({'bbox': b['bbox'], 'image_path': image_path})
                     elif b['type'] == 'image_caption':
-                        caption_text = ' '.join(span['content'] for line in b['lines'] for span in line['spans'])
+                        caption_text = ' '.join([span['content'] for line in b['lines'] for span in line['spans']])
                         image_captions.append({'bbox': b['bbox'], 'caption': caption_text})
             elif block['type'] == 'image_caption':
-                caption_text = ' '.join(span['content'] for line in block['lines'] for span in line['spans'])
+                caption_text = ' '.join([span['content'] for line in block['lines'] for span in line['spans']])
                 image_captions.append({'bbox': block['bbox'], 'caption': caption_text})
             elif block['type'] == 'table':
                 tables.append({'bbox': block['bbox'], 'table': block})
             elif block['type'] == 'table_caption':
-                caption_text = ' '.join(span['content'] for line in block['lines'] for span in line['spans'])
+                caption_text = ' '.join([span['content'] for line in block['lines'] for span in line['spans']])
                 table_captions.append({'bbox': block['bbox'], 'caption': caption_text})
 
-        for caption in image_captions:
-            if not caption['caption'].startswith('Fig'):
-                continue
-            min_dist = math.inf
-            closest_image = None
-            for image in images:
-                dist = weighted_bbox_distance(caption['bbox'], image['bbox'], wx=5, wy=1)
-                if dist < min_dist and image['bbox'][0] < caption['bbox'][0]:
-                    min_dist = dist
-                    closest_image = image
-            if closest_image:
+        fig_captions = [c for c in image_captions if c['caption'].startswith('Fig')]
+        for caption, i in zip(fig_captions, closest_pairs(fig_captions, images, wx=5, wy=1, left_of=True)):
+            if i >= 0:
                 results['images'].append({
-                    'image_path': closest_image['image_path'],
+                    'image_path': images[i]['image_path'],
                     'caption': caption['caption']
                 })
 
-        for caption in table_captions:
-            min_dist = math.inf
-            closest_table = None
-            for table in tables:
-                dist = weighted_bbox_distance(caption['bbox'], table['bbox'], wx=3, wy=1)
-                if dist < min_dist:
-                    min_dist = dist
-                    closest_table = table
-            if closest_table:
+        for caption, i in zip(table_captions, closest_pairs(table_captions, tables, wx=3, wy=1)):
+            if i >= 0:
                 results['tables'].append({
-                    'table_bbox': closest_table['bbox'],
+                    'table_bbox': tables[i]['bbox'],
                     'caption': caption['caption']
                 })
 
     return results
 
-model_file = '/home/ge25yud/Documents/Sigma-per_with_finite_middle.json'
-with open(model_file, 'r') as j:
-    middle_dict = json.load(j)
-from pprint import pprint
-pprint(process_dict(middle_dict))
\ No newline at end of file
+if __name__ == '__main__':
+    model_file = '/home/ge25yud/Documents/Sigma-per_with_finite_middle.json'
+    # stream one page at a time instead of materialising the whole middle_json
+    with open(model_file, 'rb') as j:
+        pairs = process_pages(ijson.items(j, 'pdf_info.item', use_float=True))
+    from pprint import pprint
+    pprint(pairs)
@@ -4,29 +4,35 @@ from sympy import simplify, Eq
 from pylatexenc.latex2text import LatexNodes2Text
 from cleanTex import normalize_malformed_latex
 
+# LaTeX command with one braced argument: group(1) = command, group(2) = argument
+_LATEX_CMD_RE = re.compile(r'(\\[a-zA-Z]+\*?)\s*\{([^}]*)\}')
+_WS_RE = re.compile(r'\s+')
+# deletes every character \s matches (all of str.isspace(), not just ASCII)
+_WS_TABLE = str.maketrans('', '', '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002'
+                                  '\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029'
+                                  '\u202f\u205f\u3000')
+# one converter per process: the constructor builds pylatexenc's macro tables
+_CONVERTER = LatexNodes2Text(math_mode='text', keep_braced_groups=False)
 
-def clean_latex_ocr(ocr_text):
-    # Pattern to match LaTeX commands starting with backslash
-    pattern = re.compile(r'(\\\\[a-zA-Z]+\*?\s*\{[^}]*\})')
 
-    parts = pattern.split(ocr_text)
+def latex_to_plain(latex_str):
+    """LaTeX → plain text with the shared module-level converter."""
+    return _CONVERTER.latex_to_text(latex_str)
+
+
+def clean_latex_ocr(ocr_text):
     cleaned_parts = []
+    pos = 0
 
-    for part in parts:
-        if pattern.match(part):
-            # This is a LaTeX command, clean its argument
-            # Separate command and argument
-            cmd_match = re.match(r'(\\[a-zA-Z]+\*?)\s*\{([^}]*)\}', part)
-            if cmd_match:
-                command = cmd_match.group(1)
-                argument = cmd_match.group(2).replace(" ", "")
-                cleaned_parts.append(f"{command}{{{argument}}}")
-            else:
-                # If no argument (edge case), leave as-is
-                cleaned_parts.append(part)
-        else:
-            # Clean normal text: remove spaces between characters
-            cleaned_parts.append(part.replace(" ", ""))
+    for cmd_match in _LATEX_CMD_RE.finditer(ocr_text):
+        # Clean normal text: remove spaces between characters
+        cleaned_parts.append(ocr_text[pos:cmd_match.start()].replace(" ", ""))
+        # This is a LaTeX command, clean its argument
+        command = cmd_match.group(1)
+        argument = cmd_match.group(2).replace(" ", "")
+        cleaned_parts.append(f"{command}{{{argument}}}")
+        pos = cmd_match.end()
+    cleaned_parts.append(ocr_text[pos:].replace(" ", ""))
 
     return ''.join(cleaned_parts)
 
@@ -51,7 +57,8 @@ def simple_latex_cleaner(ocr_text):
 
     # Collapse multiple spaces into single space
     #cleaned = re.sub(r'\\n', '', cleaned)
-    cleaned = re.sub(r'\s+', '', cleaned)
+    # (removes all whitespace; str.translate does it in one C loop, no regex engine)
+    cleaned = cleaned.translate(_WS_TABLE)
 
     # Strip leading and trailing spaces
     #cleaned = cleaned.strip()
@@ -60,16 +67,12 @@ def simple_latex_cleaner(ocr_text):
 
 if __name__ == '__main__':
     # Example usage:
-    converter = LatexNodes2Text(
-        math_mode='text',
-        keep_braced_groups=False
-    )
     bew = r'$$( 1 + \lambda V _ {  { D S } } )$$'
     ocr_example = r"$$\n\begin{array} { r } { I _ { \mathrm { D S } } = ( \displaystyle \frac { W } { L } ) I _ { P } ^ { \prime } [ \frac { 3 V _ { \mathrm { D S } } } { V _ { \mathrm { p o } } } - 2 [ \{ \frac { ( V _ { \mathrm { D S } } - V _ { \mathrm { G S } } + V _ { \mathrm { b i } } ) } { V _ { \mathrm { p o } } } \\} ^ { 3 / 2 }   }  {   - \{ \frac { ( - V _ { \mathrm { G S } } + V _ { \mathrm { b i } } ) } { V _ { \mathrm { p o } } } \} ^ { 3 / 2 } ] ( 1 + \lambda V _ { \mathrm { D S } } ) } \end{array}\n$$"
     example = r"I_{\rm DS} = \!\!\left({W \over L}\right)\!I_{P}^{\prime}\Bigg[{3V_{\rm DS} \over V_{\rm po}} - 2\!\left[\left\{{(V_{\rm DS} - V_{\rm GS} + V_{\rm bi}) \over V_{\rm po}}\right\}^{3/2}\right.\hfill\cr\hfill - \left.\left\{{(-V_{\rm GS} + V_{\rm bi}) \over V_{\rm po}}\right\}^{3/2} \right]\Bigg](1 + \lambda V_{\rm DS})\quad\hbox{(1)}}"
-    cleaned_formula = converter.latex_to_text(ocr_example)
-    cleaned_formula = re.sub(r'\s+', '', cleaned_formula)
-    cleaned_example = converter.latex_to_text(normalize_malformed_latex(example))
+    cleaned_formula = latex_to_plain(ocr_example)
+    cleaned_formula = _WS_RE.sub('', cleaned_formula)
+    cleaned_example = latex_to_plain(normalize_malformed_latex(example))
     print(cleaned_formula)
     print(cleaned_example)
     #expr1 = parse_latex(cleaned_formula)
@@ -1,66 +1,65 @@
-import json
+import os
 import re
-import pprint
+import hashlib
+import logging
+import pickle
+from functools import lru_cache
+from pathlib import Path
 from typing import List, Dict, Tuple, Any
-from ParseMagicJSONfuncs import hierarchical_parse, get_prefix, load_json, save_json
-from pylatexenc.latex2text import LatexNodes2Text
-from OCR_Formel_cleanup import simple_latex_cleaner
-
-def parse_formulae(text: str) -> List[Dict[str, str]]:
-    """
-    Return [{'cleaned text': 'C_ p', 'raw latex': '$C_{\\rm p}$'}, …]
-    'cleaned text' is a very coarse strip of LaTeX commands – good enough for now.
-    """
-    _LATEX_RE = re.compile(r"\$([^$]+)\$")  # captures inner part of $…$
-    out: List[Dict[str, str]] = []
+import ParseMagicJSONfuncs
+from ParseMagicJSONfuncs import hierarchical_parse, get_prefix, loads_json, save_json
+
+_LATEX_RE = re.compile(r"\$([^$]+)\$")  # captures inner part of $…$
+_CMD_STRIP_RE = re.compile(r"\\[a-zA-Z]+|[{}]")
+_WS_RE = re.compile(r"\s+")
+
+# on-disk cache for parse_json_file: md5(parser source + content_list bytes) → pickled
+# final_output; keying on the source means an edited parser never reads stale pickles
+try:
+    _CACHE_DIR = Path.home() / ".cache" / "parsemagic"
+except (RuntimeError, KeyError):        # no usable home directory: run uncached
+    _CACHE_DIR = None
+_CODE_HASH = hashlib.md5(
+    Path(__file__).read_bytes() + Path(ParseMagicJSONfuncs.__file__).read_bytes()
+).hexdigest()[:12]
+
+@lru_cache(maxsize=4096)
+def _formulae(text: str) -> Tuple[Tuple[str, str], ...]:
+    """(cleaned, raw) pairs for text; cached, since captions/equation refs repeat verbatim."""
+    out: List[Tuple[str, str]] = []
     for m in _LATEX_RE.finditer(text):
         raw = f"${m.group(1)}$"
-        cleaned = re.sub(r"\\[a-zA-Z]+|[{}]", "", m.group(1)).strip()
-        cleaned = re.sub(r"\s+", " ", cleaned)
+        cleaned = _CMD_STRIP_RE.sub("", m.group(1)).strip()
+        cleaned = _WS_RE.sub(" ", cleaned)
         cleaned = cleaned.replace("__", "_")
         if cleaned:
-            out.append({"cleaned text": cleaned, "raw latex": raw})
-    return out
+            out.append((cleaned, raw))
+    return tuple(out)
 
 
-def collect_region_content(
-    data: List[Dict], region_start: int, region_end: int
-) -> List[Dict[str, Any]]:
+def parse_formulae(text: str) -> List[Dict[str, str]]:
     """
-    Walk through data[region_start+1 .. region_end]. For each "text" item,
-    return {"text": <string>}. Skip empty strings. Do NOT include image/table here.
+    Return [{'cleaned text': 'C_ p', 'raw latex': '$C_{\\rm p}$'}, …]
+    'cleaned text' is a very coarse strip of LaTeX commands – good enough for now.
     """
-    content: List[Dict[str, Any]] = []
-    for idx in range(region_start + 1, region_end + 1):
-        item = data[idx]
-        if item.get('text_level') == 1:
-            break
-        item_type = item.get("type", "")
-        if item_type.startswith("text"):
-            para = item.get("text", "").strip()
-            if not para:
-                continue
-
-        formulae = parse_formulae(para)
-        content_dict = {"text": para}
-        if formulae:
-            content_dict["formulae"] = formulae
-        content.append(content_dict)
-    return content
+    # fresh dicts per call, so cache hits never share mutable output
+    return [{"cleaned text": cleaned, "raw latex": raw} for cleaned, raw in _formulae(text)]
 
 
-def build_body_text(
+def collect_all(
     data: List[Dict], parsed_hierarchy: List[Dict]
-) -> Dict[str, Any]:
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """
-    Build the "body text" structure, nesting subsections under keys of the form:
-      "<parent_prefix> - <sub_title>"
+    Single pass over data. Returns
+      • the "body text" structure, nesting subsections under keys of the form
+        "<parent_prefix> - <sub_title>"
+      • the "figures and tables" dict
 
     For each top-level section:
       key = section["title"]  # e.g. "I. INTRODUCTION"
       value = {
         "heading": section["title"],
-        "text": [ { "text": ... }, ... ],
+        "text": [ "...", { "text": ..., "formulae": [...] }, ... ],
         "subsections": { ... nested ... }
       }
 
@@ -68,19 +67,31 @@ def build_body_text(
       sub_key = f"{parent_prefix} - {sub['title']}"
       value = {
         "heading": sub["title"],
-        "text": [ { "text": ... }, ... ],
+        "text": [ ... ],
         "subsections": {}  # (no deeper nesting in this paper)
       }
+
+    A section's / subsection's text is every non-empty "text" item in
+    data[region_start+1 .. region_end], up to the next header (text_level 1):
+    a plain string, or {"text": ..., "formulae": [...]} if it contains $…$ formulae.
+
+    Figures and tables (whole document, in order of appearance):
+      "fig1", "fig2", … → {"caption": <first img_caption>, "fig_num": <int>, "figure": <img_path>}
+      "table1", …       → {"caption": <first table_caption>, "table_num": <int>, "table": <table_body HTML>}
     """
     body_text: Dict[str, Any] = {}
 
+    # owner[idx] → text list that data[idx] feeds. Sibling regions are disjoint and a
+    # subsection starts at a header, where its parent's text stops anyway, so one owner
+    # per item is enough: subsections simply overwrite the tail of the parent's region.
+    owner: List[Any] = [None] * len(data)
+
     for sec in parsed_hierarchy:
         sec_title = sec["title"]  # e.g. "I. INTRODUCTION"
         parent_prefix = get_prefix(sec_title)  # e.g. "I"
         region_start, region_end = sec["region"]
-
-        # Collect paragraphs within this section
-        paragraphs = collect_region_content(data, region_start, region_end)
+        paragraphs: List[Dict[str, Any]] = []
+        owner[region_start + 1:region_end + 1] = [paragraphs] * (region_end - region_start)
 
         # Build nested subsections
         subsecs_dict: Dict[str, Any] = {}
@@ -88,7 +99,10 @@ def build_body_text(
             sub_title = sub["title"]  # e.g. "A. Noise Considerations"
             sub_key = f"{parent_prefix} - {sub_title}"
             sub_region_start, sub_region_end = sub["region"]
-            sub_paragraphs = collect_region_content(data, sub_region_start, sub_region_end)
+            sub_paragraphs: List[Dict[str, Any]] = []
+            owner[sub_region_start + 1:sub_region_end + 1] = (
+                [sub_paragraphs] * (sub_region_end - sub_region_start)
+            )
 
             # In this document, there are no deeper levels, so we set an empty dict for further nesting
             subsecs_dict[sub_key] = {
@@ -103,88 +117,119 @@ def build_body_text(
             "subsections": subsecs_dict,
         }
 
-    return {"body text": body_text}
-
-
-def extract_figures_and_tables(data: List[Dict]) -> Dict[str, Any]:
-    """
-    From the content_list JSON, collect all images and tables into a single dict.
-    Keys:
-      - "fig1", "fig2", ... for images (in order of appearance)
-      - "table1", "table2", ... for tables
-    Each figure entry has:
-      {
-        "caption": <first img_caption string>,
-        "fig_num": <int>,
-        "figure": <img_path>
-      }
-    Each table entry has:
-      {
-        "caption": <first table_caption string>,
-        "table_num": <int>,
-        "table": <table_body HTML>
-      }
-    """
-    fig_tab_dict: Dict[str, Any] = {}
+    pairs: List[Tuple[str, Dict[str, Any]]] = []
+    pairs_append = pairs.append
     fig_counter = 0
     table_counter = 0
+    cur = None
+    halted = False
 
-    for item in data:
-        itype = item.get("type")
+    for idx, item in enumerate(data):
+        get = item.get
+        itype = get("type") or ""
         if itype == "image":
-            img_caps = item.get("img_caption", [])
-            caption = img_caps[0] if img_caps else ""
             fig_counter += 1
-            key = f"fig{fig_counter}"
-            fig_tab_dict[key] = {
-                "caption": caption,
+            pairs_append((f"fig{fig_counter}", {
+                "caption": (get("img_caption") or ("",))[0],
                 "fig_num": fig_counter,
-                "figure": item.get("img_path", "")
-            }
+                "figure": get("img_path", "")
+            }))
         elif itype == "table":
-            tbl_caps = item.get("table_caption", [])
-            caption = tbl_caps[0] if tbl_caps else ""
             table_counter += 1
-            key = f"table{table_counter}"
-            fig_tab_dict[key] = {
-                "caption": caption,
+            pairs_append((f"table{table_counter}", {
+                "caption": (get("table_caption") or ("",))[0],
                 "table_num": table_counter,
-                "table": item.get("table_body", "")
-            }
+                "table": get("table_body", "")
+            }))
+
+        content = owner[idx]
+        if content is None:
+            continue
+        if content is not cur:                 # entered the next (sub)section
+            cur, halted = content, False
+        if halted:
+            continue
+        if get("text_level") == 1:             # text stops at the next header
+            halted = True
+            continue
+        if not itype.startswith("text"):
+            continue
+        para = get("text", "").strip()
+        if not para:
+            continue
+
+        # only paragraphs with formulae need a dict, the rest stay plain strings
+        formulae = parse_formulae(para)
+        content.append({"text": para, "formulae": formulae} if formulae else para)
 
-    return {"figures and tables": fig_tab_dict}
+    return body_text, dict(pairs)
 
 def parse_json_struct(data: List[Dict]) -> List[Dict]:
-    parsed = hierarchical_parse(data)
-    hierarchy = parsed["hierarchy"]
-    # Parse the hierarchy of sections/subsections
-    parsed = hierarchical_parse(raw_data)
-    hierarchy = parsed["hierarchy"]
-
-    # Build the nested "body text" dictionary (with properly nested subsections)
-    body_text_struct = build_body_text(raw_data, hierarchy)
+    # Parse the hierarchy of sections/subsections (once)
+    hierarchy = hierarchical_parse(data)["hierarchy"]
 
-    # Extract all figures and tables into a separate dict
-    figs_and_tabs = extract_figures_and_tables(raw_data)
+    # One pass builds the nested "body text" dictionary and the figures/tables dict
+    body_text, figs_and_tabs = collect_all(data, hierarchy)
 
-    # 5. Combine into final output
+    # Combine into final output
     final_output = {
-        "body text": body_text_struct["body text"],
-        "figures and tables": figs_and_tabs["figures and tables"]
+        "body text": body_text,
+        "figures and tables": figs_and_tabs
     }
 
     return final_output
 
 
+def parse_json_file(filepath: str) -> Dict[str, Any]:
+    """
+    parse_json_struct on a content_list JSON file, cached on disk.
+    parse_json_struct is pure, so the cache is keyed on the md5 of the file
+    bytes and on the parser source: re-running the pipeline on an unchanged
+    file with unchanged code skips the parse. The cache is only an
+    optimisation; if it cannot be read or written the parse result is
+    returned as is.
+    """
+    raw = Path(filepath).read_bytes()
+    if _CACHE_DIR is None:
+        return parse_json_struct(loads_json(raw))
+    cache_file = _CACHE_DIR / f"{_CODE_HASH}-{hashlib.md5(raw).hexdigest()}.pkl"
+    try:
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:      # corrupt / foreign pickle: drop it and re-parse
+        logging.debug("parsemagic cache read failed for %s: %s", filepath, e)
+        try:
+            cache_file.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    final_output = parse_json_struct(loads_json(raw))
+
+    # write to a temp name first so a concurrent reader never sees half a pickle
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(tmp_file, "wb") as f:
+            pickle.dump(final_output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_file.replace(cache_file)
+    except OSError as e:
+        logging.debug("parsemagic cache write skipped for %s: %s", filepath, e)
+        try:
+            tmp_file.unlink(missing_ok=True)
+        except OSError:
+            pass
+    return final_output
+
+
 if __name__ == "__main__":
     # Adjust these paths as needed:
     filepath = '/home/ge25yud/Documents/Mine_Outs/6H-SiC JFETs for 450 °C Differential Sensing Applications/auto/6H-SiC JFETs for 450 °C Differential Sensing Applications_content_list.json'
-    datas = load_json(filepath)
     output_structured_path = "6H-SiC JFETs for 450 °C Differential Sensing Applications_transformed.json"
 
-    # Load the raw content_list JSON (list of items)
-    raw_data = load_json(filepath)
-    final_output = parse_json_struct(datas)
+    # Load + parse the raw content_list JSON (cached on the file's content hash)
+    final_output = parse_json_file(filepath)
 
 
     save_json(final_output, output_structured_path)
\ No newline at end of file
@@ -1,31 +1,49 @@
-import json
 import re, pprint
-from typing import List, Dict, Tuple, Any
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import List, Dict, Any
+import orjson
 
 
 # ─────────────────────────────
 #  I/O helpers
 # ─────────────────────────────
+_IO_BUFSIZE = 1 << 16       # 64 KiB reads/writes for multi-MB content lists
+
+
+def loads_json(raw: bytes) -> Any:
+    return orjson.loads(raw)
+
+
 def load_json(fp: str) -> List[Dict]:
-    with open(fp, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(fp, "rb", buffering=_IO_BUFSIZE) as f:
+        return loads_json(f.read())
 
 
 def save_json(obj: Any, fp: str) -> None:
-    with open(fp, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, ensure_ascii=False)
+    # orjson always emits UTF-8 (≙ ensure_ascii=False)
+    out = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    with open(fp, "wb", buffering=_IO_BUFSIZE) as f:
+        f.write(out)
 
 
 # ─────────────────────────────
 #  Header utilities
 # ─────────────────────────────
 def extract_all_headers(data: List[Dict]) -> List[Dict]:
-    """Return every item whose text_level == 1 and type contains 'text'."""
-    return [
-        {"idx": i, "text": it["text"].strip()}
-        for i, it in enumerate(data)
-        if it.get("text_level") == 1 and "text" in it.get("type", "")
-    ]
+    """
+    Return every item whose text_level == 1 and type contains 'text', with its
+    prefix and prefix format worked out once for the filter and the recursion.
+    """
+    out: List[Dict] = []
+    out_append = out.append
+    for i, it in enumerate(data):
+        get = it.get
+        if get("text_level") != 1:         # most items are body text: one lookup
+            continue
+        if "text" in get("type", ""):
+            out_append(_header(i, it["text"].strip()))
+    return out
 
 
 def find_introduction_idx(headers: List[Dict]) -> int:
@@ -35,18 +53,26 @@ def find_introduction_idx(headers: List[Dict]) -> int:
     raise ValueError("INTRODUCTION header not found")
 
 
+_PREFIX_RE = re.compile(r"^(\S+)[.)]?\s+")
+_ALPHA_RE = re.compile(r"[A-Z]")
+_NUMERIC_RE = re.compile(r"\d+(\.\d+)+")
+
+
+# header texts repeat across hierarchical_parse and every recursion level;
+# bounded, since pool workers live for the whole corpus
+@lru_cache(maxsize=4096)
 def get_prefix(text: str) -> str:
     """Return the leading token before the first space (e.g. 'I.', 'A.' → 'I', 'A')."""
-    m = re.match(r"^(\S+)[.)]?\s+", text)
+    m = _PREFIX_RE.match(text)
     return m.group(1) if m else ""
 
 
 # ★ UPDATED — far stricter Roman-numeral check
-_ROMAN_1_50 = (
+# canonical numerals only (no IIII / VX / IL …): one hash lookup, no alternation walk
+_ROMAN_1_50 = frozenset((
     "I|II|III|IV|V|VI|VII|VIII|IX|X|XI|XII|XIII|XIV|XV|XVI|XVII|XVIII|"
     "XIX|XX|XXI|XXII|XXIII|XXIV|XXV|XXVI|XXVII|XXVIII|XXIX|XXX|XL|L"
-)
-_ROMAN_RE = re.compile(rf"^({_ROMAN_1_50})$")
+).split("|"))
 
 DEPTH_NAME = {
     0: "section",
@@ -61,19 +87,25 @@ def depth_to_label(depth: int) -> str:
     return DEPTH_NAME.get(depth, f"level{depth}")
 
 
+@lru_cache(maxsize=4096)
 def get_prefix_format(prefix: str) -> str:
     p = prefix.rstrip(".)").upper()
-    if _ROMAN_RE.fullmatch(p):                 # I … L   (1–50)
+    if p in _ROMAN_1_50:                       # I … L   (1–50)
         return "roman"
     if p.isdigit():                            # 1, 2, 3 …
         return "arabic"
-    if re.fullmatch(r"[A-Z]", p):              # A, B, C …
+    if _ALPHA_RE.fullmatch(p):                 # A, B, C …
         return "alpha"
-    if re.fullmatch(r"\d+(\.\d+)+", p):        # 1.1, 2.3.4 …
+    if _NUMERIC_RE.fullmatch(p):               # 1.1, 2.3.4 …
         return "numeric"
     return "none"
 
 
+def _header(idx: int, text: str) -> Dict:
+    prefix = get_prefix(text)
+    return {"idx": idx, "text": text, "prefix": prefix, "fmt": get_prefix_format(prefix)}
+
+
 def classify_level(fmt: str, text_upper: str) -> str:
     if fmt in ("roman", "arabic"):
         return "section"
@@ -85,22 +117,6 @@ def classify_level(fmt: str, text_upper: str) -> str:
 # ─────────────────────────────
 #  Region helpers
 # ─────────────────────────────
-def determine_regions(
-    headers: List[Dict],
-    start: int,
-    end: int,
-    upper_bound: int,         # exclusive
-) -> List[Tuple[int, int]]:
-    """Return (region_start, region_end) for each headers[start..end]."""
-    positions = [h["idx"] for h in headers[start : end + 1]]
-    regions: List[Tuple[int, int]] = []
-    for i, pos in enumerate(positions):
-        region_start = pos
-        region_end = positions[i + 1] - 1 if i + 1 < len(positions) else upper_bound - 1
-        regions.append((region_start, region_end))
-    return regions
-
-
 def extract_subheaders(
     data: List[Dict], start: int, end: int
 ) -> List[Dict]:
@@ -112,10 +128,18 @@ def extract_subheaders(
             txt = it["text"].strip()
             if "REFERENCES" in txt.upper():
                 break
-            subs.append({"idx": idx, "text": txt})
+            subs.append(_header(idx, txt))
     return subs
 
 
+def _until_references(hdrs: List[Dict], lo: int, hi: int) -> List[Dict]:
+    """hdrs[lo:hi], cut at the first REFERENCES header (as extract_subheaders does)."""
+    for i in range(lo, hi):
+        if "REFERENCES" in hdrs[i]["text"].upper():
+            return hdrs[lo:i]
+    return hdrs[lo:hi]
+
+
 # ─────────────────────────────
 #  Recursive parser  ★ UPDATED
 # ─────────────────────────────
@@ -125,23 +149,39 @@ def recursive_region_parser(
     start: int,
     end: int,
     upper_bound: int,         # exclusive limit for this level
-    depth: int = 0
+    depth: int = 0,
+    all_hdrs: List[Dict] = None,
+    all_idx: List[int] = None,
 ) -> List[Dict]:
+    """
+    all_hdrs / all_idx: every header of the document (extract_all_headers) and
+    their data indices, sorted. When given, a region's child headers are found
+    by bisecting all_idx instead of rescanning data at every level.
+    """
     sections: List[Dict] = []
-    regions = determine_regions(headers, start, end, upper_bound)
-
-    for i, (r_start, r_end) in enumerate(regions):
-        hdr = headers[start + i]
-        prefix = get_prefix(hdr["text"])
-        fmt = get_prefix_format(prefix)
-        level = depth_to_label(depth)#classify_level(fmt, hdr["text"].upper())
+    if start > end:                       # no headers at this level
+        return sections
+    level = depth_to_label(depth)#classify_level(fmt, hdr["text"].upper())
+
+    # region of headers[i] runs up to the next header at this level (or upper_bound)
+    for i in range(start, end + 1):
+        hdr = headers[i]
+        prefix = hdr["prefix"]
+        fmt = hdr["fmt"]
+        r_start = hdr["idx"]
+        r_end = headers[i + 1]["idx"] - 1 if i < end else upper_bound - 1
 
         # immediate children inside this region
-        child_headers = extract_subheaders(data, r_start + 1, r_end)
+        if all_idx is None:
+            child_headers = extract_subheaders(data, r_start + 1, r_end)
+        else:
+            lo = bisect_left(all_idx, r_start + 1)
+            hi = bisect_right(all_idx, r_end, lo)
+            child_headers = _until_references(all_hdrs, lo, hi)
         subsections = (
             recursive_region_parser(
                 data, child_headers, 0, len(child_headers) - 1,
-                r_end + 1, depth + 1
+                r_end + 1, depth + 1, all_hdrs, all_idx
             )
             if child_headers
             else []
@@ -168,7 +208,7 @@ def recursive_region_parser(
 def hierarchical_parse(data: List[Dict]) -> Dict[str, Any]:
     hdrs = extract_all_headers(data)
     intro_i = find_introduction_idx(hdrs)
-    into_fmt = get_prefix_format(get_prefix(hdrs[intro_i]["text"]))
+    into_fmt = hdrs[intro_i]["fmt"]
 
     body_end = next(                       # stop at “REFERENCES” or EOF
         (h["idx"] for h in hdrs if "REFERENCES" in h["text"].upper()),
@@ -180,14 +220,14 @@ def hierarchical_parse(data: List[Dict]) -> Dict[str, Any]:
     for h in hdrs[intro_i:]:
         if h["idx"] >= body_end:
             break
-        fmt = get_prefix_format(get_prefix(h["text"]))
-        if fmt == into_fmt: #classify_level(fmt, h["text"].upper()) == "section":
+        if h["fmt"] == into_fmt: #classify_level(fmt, h["text"].upper()) == "section":
             section_hdrs.append(h)
 
     section_format = into_fmt #get_prefix_format(get_prefix(section_hdrs[0]["text"]))
 
     hierarchy = recursive_region_parser(
-        data, section_hdrs, 0, len(section_hdrs) - 1, body_end
+        data, section_hdrs, 0, len(section_hdrs) - 1, body_end,
+        all_hdrs=hdrs, all_idx=[h["idx"] for h in hdrs]
     )
 
     return {"section_format": section_format, "hierarchy": hierarchy, "body_end": body_end}
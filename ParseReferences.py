@@ -1,7 +1,10 @@
 import json
 from pathlib import Path
 import re
+import orjson
 import requests as req
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup as bSoup
 from bs4.element import Tag
 import logging
@@ -10,15 +13,36 @@ from ParseIEEEHead import process_math
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# clean_text / extract_details patterns, compiled once per process
+_MATH_RE = re.compile(r'\\\$.*?\\\$')
+_WS_RE = re.compile(r'\s+')
+_SPLIT_AUTHORS_RE = re.compile(r',\s+and\s+| and |, ')
+_SOURCE_RE = re.compile(r'<em>(.*?)</em>')
+_YEAR_RE = re.compile(r'\b(19|20)\d{2}\b')
+_VOL_RE = re.compile(r'vol\.\s*(\d+)', re.IGNORECASE)
+_ISS_RE = re.compile(r'no\.\s*(\d+)', re.IGNORECASE)
+_PAGES_RE = re.compile(r'pp\.\s*(\d+)-(\d+)', re.IGNORECASE)
+_PAGE_RE = re.compile(r'pp\.\s*(\d+)', re.IGNORECASE)
+
+# transient gateway errors from the proxy are retried with backoff
+_RETRY = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+
+
+def _mount_retries(sess: req.Session):
+    """Mount the retrying adapter once per session (re-mounting would drop its kept-alive pool)."""
+    if sess.get_adapter("https://").max_retries is not _RETRY:
+        sess.mount("https://", HTTPAdapter(max_retries=_RETRY))
+
 
 def parse_references(arNum: str, sess: req.Session):
-    ref_url = "https://ieeexplore-ieee-org.eaccess.tum.edu/rest/document/{arNum}/references"
+    ref_url = f"https://ieeexplore-ieee-org.eaccess.tum.edu/rest/document/{arNum}/references"
 
+    _mount_retries(sess)
     response = sess.get(ref_url)
     if response.ok:
         try: 
-            data = response.json()
-        except json.JSONDecodeError as e:
+            data = orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
             logging.error(f"Failed to parse Reference JSON: {e}")
             return None
     else:
@@ -37,10 +61,10 @@ def clean_text(raw: str):
     # Step 1: Remove LaTeX/math expressions like \$...$
     
     cleaned = process_math(raw)
-    cleaned = re.sub(r'\\\$.*?\\\$', '', raw)
+    cleaned = _MATH_RE.sub('', raw)
 
     # Step 2: Collapse multiple spaces to single
-    cleaned = re.sub(r'\s+', ' ', cleaned)
+    cleaned = _WS_RE.sub(' ', cleaned)
 
     # Step 3: Strip leading/trailing whitespace
     cleaned = cleaned.strip()
@@ -103,33 +127,58 @@ def get_referenceDict(ref: dict):
     refDict[id]["raw text"] = ref_text
     return refDict
 
+def _quoted_fields(text: str):
+    """
+    (authors_text, title) located with str.find instead of regexes:
+      authors_text ≙ re.match(r'^(.*?),\s*"', text).group(1) or ""
+      title        ≙ re.search(r'"([^"]+)"', text).group(1) or None
+    """
+    authors_text = ""
+    q = text.find('"')
+    while q >= 0:
+        head = text[:q].rstrip()
+        if head.endswith(','):
+            # '.' in the old pattern stopped at newlines
+            authors_text = "" if '\n' in head else head[:-1]
+            break
+        q = text.find('"', q + 1)
+
+    title = None
+    q1 = text.find('"')
+    while q1 >= 0:
+        q2 = text.find('"', q1 + 1)
+        if q2 < 0:
+            break
+        if q2 > q1 + 1:
+            title = text[q1 + 1:q2]
+            break
+        q1 = q2                     # empty "" — closing quote opens the next try
+    return authors_text, title
+
+
 def extract_details(text: str, sel: bool=False):
-    # Match authors: before the first quotation mark
-    authors_match = re.match(r'^(.*?),\s*"', text)
-    authors_text = authors_match.group(1) if authors_match else ""
+    # Match authors: before the first quotation mark preceded by a comma
+    authors_text, title = _quoted_fields(text)
 
     # Split authors by ', and' or ' and ' or just ',' (handling Oxford commas and variants)
-    authors = re.split(r',\s+and\s+| and |, ', authors_text)
+    authors = _SPLIT_AUTHORS_RE.split(authors_text)
 
     # Match source/journal/conference: after the title in <em> tags
-    source_match = re.search(r'<em>(.*?)</em>', text)
+    source_match = _SOURCE_RE.search(text)
     source = source_match.group(1) if source_match else ""
 
-    title_match = re.search(r'"([^"]+)"', text)
-    title = title_match.group(1) if title_match else None
-
     # Match year: typically found near end, often a 4-digit year
-    year_match = re.search(r'\b(19|20)\d{2}\b', text)
+    year_match = _YEAR_RE.search(text)
     year = year_match.group(0) if year_match else ""
 
-    volume_match = re.search(r'vol\.\s*(\d+)', text, re.IGNORECASE)
+    volume_match = _VOL_RE.search(text)
     volume = volume_match.group(1) if volume_match else None
 
-    iss_match = re.search(r'no\.\s*(\d+)', text, re.IGNORECASE)
+    iss_match = _ISS_RE.search(text)
     issue = iss_match.group(1) if iss_match else None
 
-    pages_match = re.search(r'pp\.\s*(\d+)-(\d+)', text, re.IGNORECASE)
-    page_match = re.search(r'pp\.\s*(\d+)', text, re.IGNORECASE)
+    pages_match = _PAGES_RE.search(text)
+    page_match = None if pages_match else _PAGE_RE.search(text)
     if pages_match:
         pages = f"{pages_match.group(1)}-{pages_match.group(2)}"
     elif page_match:
@@ -1,15 +1,15 @@
 
 from __future__ import annotations
 import argparse
-import sys, os, time, json, logging
+import sys, os, time, logging
+import orjson
 import multiprocessing as mp
-# Set multiprocessing start method to 'spawn' for CUDA compatibility
-mp.set_start_method('spawn', force=True)
 
 
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from itertools import chain, islice
 from pathlib import Path
-from typing import Union, List, Dict
+from typing import Any, Union, List, Dict, Iterator
 from tqdm import tqdm
 import torch
 
@@ -19,11 +19,12 @@ from ParseMagicJSONfuncs import hierarchical_parse
 from cleanMagicOut import clean_bad_entry
 from PyDFfuncs import get_pdf_arnum
 
-def _init_worker(log_level: str):
-    """
-    This function will run in each worker process exactly once,
-    before any calls to `_process_pdf()` occur.
-    """
+_minermagic = None      # MinerU entry point, imported once per worker
+# orjson output ≙ json.dumps(..., ensure_ascii=False, indent=2), non-str keys coerced like json
+_JSON_OPTS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+def _init_logging(log_level: str):
+    """Per-process logging setup for the pool workers."""
     logging.basicConfig(
         level=log_level.upper(),
         format="%(asctime)s %(levelname)-s %(message)s",
@@ -31,64 +32,102 @@ def _init_worker(log_level: str):
         stream=sys.stdout,
     )
 
+def _init_worker(log_level: str, gpu_q: Any = None):
+    """
+    This function will run in each MinerU worker process exactly once,
+    before any calls to `_mine_pdf()` occur.
+    The worker takes one GPU token for its whole lifetime: CUDA_VISIBLE_DEVICES
+    is only honoured if set before CUDA is initialised, i.e. before MinerU loads.
+    """
+    global _minermagic
+    _init_logging(log_level)
+    if gpu_q is not None:
+        gpu_id = gpu_q.get()
+        os.environ["CUDA_VISIBLE_DEVICES"] = str(gpu_id)
+        logging.info("Worker %d bound to GPU %d", os.getpid(), gpu_id)
+    # Heavy MinerU import happens here instead of per PDF; MinerU keeps its
+    # loaded models in a per-process singleton, so they are reused across tasks
+    from MinerBasicMagic import minermagic
+    _minermagic = minermagic
+
 #NoGroBiD: Dict[str, str] = {}
 
-def _process_pdf(args: tuple[Path, Path, int],
-                 grobid_url: str = "http://localhost:8070"
-                 ) -> Union[None, tuple[Path, bool]]:
+def _mine_pdf(args: tuple[Path, Path]
+              ) -> tuple[Path, Path, Any, Union[None, Dict[str, Any]]]:
+    """
+    Stage 1 (GPU pool): run minermagic on one PDF, writing into its own subfolder
+    under output_root, and build the flat body schema from it.
+    Returns (pdf_path, output_root, arnum, body_dict); body_dict is None on failure.
+    """
     # Unpack tuple
-    pdf_path, output_root, gpu_id = args
-    # Assign GPU for this process
-    os.environ["CUDA_VISIBLE_DEVICES"] = str(gpu_id)
-    logging.info("[%s] Using GPU %d", pdf_path.name, gpu_id)
-    IEEE_Fold = Path(os.getenv('IEEE_REPO'))
+    pdf_path, output_root = args
     arnum = get_pdf_arnum(str(pdf_path), pdf_path.name)
-
-    from MinerBasicMagic import minermagic
-
-    """Run minermagic on one PDF, writing into its own subfolder under output_root."""
-    #stem = pdf_path.stem
-    #pdf_out = output_root / stem
-    #pdf_out.mkdir(parents=True, exist_ok=True)
-    #timing = time.perf_counter()
     try:
-
         json_out = output_root / f"{arnum}.json"
-        pred_dir = IEEE_Fold / 'predictions'
-        pred_dir.mkdir(exist_ok=True, parents=True)
-        miner_out = minermagic(str(pdf_path), str(output_root), False)
+        miner_out = _minermagic(str(pdf_path), str(output_root), False)
         filtered_data = miner_out #clean_bad_entry(miner_out)
-        json_out.write_text(json.dumps(filtered_data, ensure_ascii=False, indent=2), encoding="utf-8")
-        hierarchy = hierarchical_parse(filtered_data)["hierarchy"]
-        body_end = hierarchical_parse(filtered_data)["body_end"]
+        json_out.write_bytes(orjson.dumps(filtered_data, option=_JSON_OPTS))
+        parsed = hierarchical_parse(filtered_data)
+        hierarchy = parsed["hierarchy"]
+        body_end = parsed["body_end"]
         body_dict = build_flat_schema(filtered_data, hierarchy, body_end)
-        full_json_out = pred_dir/f"{arnum}.json"
-        try:
-            content, refs_dict = grobid_process(pdf_path, grobid_url, output_root, False)
-            content = content | body_dict
-            #for key, item in body_dict.items():
-             #   content[key] = item
-            content["bibliographical references"] = refs_dict
-            full_json_out.write_text(json.dumps(content, ensure_ascii=False, indent=2), encoding="utf-8")
-
-            logging.debug("Processed: %s", pdf_path.name)
-        except Exception as e:
-            logging.error("Failure processing %s through GroBiD. Only outputting Miner JSON.", e)
-
-            full_json_out.write_text(json.dumps(body_dict, ensure_ascii=False, indent=2), encoding="utf-8")
-            logging.debug("Partially processed: %s", pdf_path.name)
-            return pdf_path, True
     except Exception as e:
         logging.error("Failed to process %s: %s", pdf_path.name, e)
-        return pdf_path, False
+        return pdf_path, output_root, arnum, None
+    return pdf_path, output_root, arnum, body_dict
+
+def _mine_batch(batch: List[tuple[Path, Path]]) -> List[tuple[Path, Path, Any, Union[None, Dict[str, Any]]]]:
+    """Stage 1 for a chunk of PDFs handed to one worker in a single IPC round-trip."""
+    return [_mine_pdf(args) for args in batch]
+
+def _grobid_pdf(pdf_path: Path, output_root: Path, arnum: Any,
+                body_dict: Dict[str, Any],
+                grobid_url: str = "http://localhost:8070") -> Union[None, tuple[Path, bool]]:
+    """
+    Stage 2 (CPU/IO pool): GroBiD header + references for one PDF, merged with
+    its MinerU body; falls back to the MinerU JSON alone if GroBiD fails.
+    """
+    full_json_out = Path(os.getenv('IEEE_REPO')) / 'predictions' / f"{arnum}.json"
+    try:
+        content, refs_dict = grobid_process(pdf_path, grobid_url, output_root, False)
+        content = content | body_dict
+        #for key, item in body_dict.items():
+         #   content[key] = item
+        content["bibliographical references"] = refs_dict
+        full_json_out.write_bytes(orjson.dumps(content, option=_JSON_OPTS))
+
+        logging.debug("Processed: %s", pdf_path.name)
+    except Exception as e:
+        logging.error("Failure processing %s through GroBiD. Only outputting Miner JSON.", e)
+
+        full_json_out.write_bytes(orjson.dumps(body_dict, option=_JSON_OPTS))
+        logging.debug("Partially processed: %s", pdf_path.name)
+        return pdf_path, True
     return None
 
+def _iter_pdfs(root: Path, recursive: bool = False) -> Iterator[Path]:
+    """
+    Lazily yield the PDFs under root (os.scandir, no per-entry stat or Path.suffix).
+    run_parallel pulls from it only as its submission window frees up, so the
+    walk advances alongside the workers instead of being read up front.
+    """
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith('.pdf'):
+                    yield Path(entry.path)
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+
 def run_parallel(
         inputs: Union[str, List[str]],
         output: Union[str, None] = None,
         workers: int = 4,
         recursive: bool = False,
         log_level: str = "INFO",
+        chunksize: int = 1,
+        grobid_workers: Union[int, None] = None,
 ):
     """
     Batch process PDFs in parallel via MinerU.
@@ -99,6 +138,9 @@ def run_parallel(
         workers: number of parallel processes.
         recursive: whether to recurse into subdirectories if inputs is dir.
         log_level: logging level.
+        chunksize: PDFs sent to a worker per IPC round-trip; >1 only pays
+            off for many small PDFs, 1 keeps the GPUs most evenly loaded.
+        grobid_workers: processes for the GroBiD stage (defaults to workers).
     """
     # Start overall timer
     overall_start = time.perf_counter()
@@ -107,9 +149,7 @@ def run_parallel(
     if isinstance(inputs, str) and Path(inputs).is_dir():
         # Single directory input
         dir_path = Path(inputs)
-        pdf_paths = (
-            list(dir_path.rglob("*.pdf")) if recursive else list(dir_path.glob("*.pdf"))
-        )
+        pdf_paths = _iter_pdfs(dir_path, recursive)
         output_root = Path(inputs) / "output" if not output else None
     else:
         # Single file or list of PDF paths
@@ -117,9 +157,13 @@ def run_parallel(
         pdf_paths = [Path(p) for p in paths if Path(p).is_file() and Path(p).suffix.lower() == ".pdf"]
         output_root = Path("output") if not output else None
 
-    if not pdf_paths:
+    # peek at the first PDF only; the rest is pulled in as the submission window frees up
+    pdf_paths = iter(pdf_paths)
+    first_pdf = next(pdf_paths, None)
+    if first_pdf is None:
         logging.error("No PDF files found in inputs: %s", inputs)
         return
+    pdf_paths = chain([first_pdf], pdf_paths)
 
     # Determine default output
     if output and not output_root:
@@ -127,32 +171,79 @@ def run_parallel(
 
     output_root.mkdir(parents=True, exist_ok=True)
     logging.info("Writing outputs to: %s", output_root)
+    # shared by every PDF: create it here once instead of per PDF in the workers
+    (Path(os.getenv('IEEE_REPO')) / 'predictions').mkdir(parents=True, exist_ok=True)
 
     # Detect GPUs
     gpu_count = torch.cuda.device_count() if torch.cuda.is_available() else 0
+
+    # 'spawn' for CUDA compatibility. CPU-only runs fork workers from a forkserver
+    # that has MinerU (and torch) preloaded, instead of re-importing them per worker
+    if gpu_count == 0:
+        ctx = mp.get_context('forkserver')
+        ctx.set_forkserver_preload(['MinerBasicMagic'])
+    else:
+        ctx = mp.get_context('spawn')
+
     if gpu_count == 0:
         logging.warning("No CUDA GPUs detected; all work will run on CPU")
-        gpu_ids = [""] * len(pdf_paths)
+        gpu_q = None
     else:
-        gpu_ids = [i % gpu_count for i in range(len(pdf_paths))]
-        logging.info("Distributing %d PDFs across %d GPUs", len(pdf_paths), gpu_count)
+        # One GPU token per worker, spread evenly over the GPUs; each worker
+        # takes its token at start-up (handed over via initargs, so no Manager)
+        gpu_q = ctx.SimpleQueue()
+        workers_per_gpu = -(-workers // gpu_count)
+        for _ in range(workers_per_gpu):
+            for gpu_id in range(gpu_count):
+                gpu_q.put(gpu_id)
+        logging.info("Distributing PDFs across %d GPUs", gpu_count)
 
-    # Build task list with GPU assignment
-    tasks = [(pdf, output_root / pdf.stem, gpu_ids[idx]) for idx, pdf in enumerate(pdf_paths)]
+    # Tasks are built lazily, one window-slot's worth of PDFs at a time
+    tasks = ((pdf, output_root / pdf.stem) for pdf in pdf_paths)
 
-    # Launch parallel processing with 'spawn' context
-    ctx = mp.get_context('spawn')
+    # Two stages: the MinerU pool keeps the GPUs busy while the GroBiD pool waits
+    # on HTTP/OCR, instead of every worker holding its GPU through the GroBiD calls
+    failed = []
     with ProcessPoolExecutor(max_workers=workers,
                              mp_context=ctx,
-                            initializer=_init_worker,
-                            initargs=(log_level,)
-                             ) as executor:
-        futures = [executor.submit(_process_pdf, task) for task in tasks]
-        for _ in tqdm(as_completed(futures), total=len(futures), desc="Processing PDFs", unit="pdf"):
-            pass
+                             initializer=_init_worker,
+                             initargs=(log_level, gpu_q)
+                             ) as executor, \
+         ProcessPoolExecutor(max_workers=grobid_workers or workers,
+                             mp_context=ctx,
+                             initializer=_init_logging,
+                             initargs=(log_level,)
+                             ) as grobid_pool:
+        # Stage 1 is fed through a bounded window of chunks (2 per worker) and
+        # drained with wait(FIRST_COMPLETED): each PDF goes on to GroBiD as soon as
+        # MinerU is done with it, so one slow PDF does not hold back the rest
+        batches = iter(lambda: list(islice(tasks, max(1, chunksize))), [])
+        window = 2 * workers
+        pending = set()
+        grobid_futures = []
+        # total is unknown while discovery is still running
+        with tqdm(desc="Processing PDFs", unit="pdf") as pbar:
+            while True:
+                for batch in islice(batches, window - len(pending)):
+                    pending.add(executor.submit(_mine_batch, batch))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    for pdf_path, pdf_out, arnum, body_dict in fut.result():
+                        pbar.update()
+                        if body_dict is None:
+                            failed.append((pdf_path, False))
+                        else:
+                            grobid_futures.append(grobid_pool.submit(_grobid_pdf, pdf_path, pdf_out, arnum, body_dict))
+            mined = pbar.n
+        for fut in tqdm(as_completed(grobid_futures), total=len(grobid_futures),
+                        desc="GroBiD", unit="pdf"):
+            res = fut.result()
+            if res:
+                failed.append(res)
 
     # Summarize failures
-    failed = [f.result() for f in futures if f.result()]
     FailedDict = {k[0].name: str(k[0]) for k in failed if not k[1]}
     NoGroBiD = {k[0].name: str(k[0]) for k in failed if k[1]}
     if failed:
@@ -164,13 +255,13 @@ def run_parallel(
         if NoGroBiD:
             logging.error("%d failed to parse through GroBiD:", len(NoGroBiD))
     else:
-        logging.info("All %d PDFs processed successfully.", len(pdf_paths))
+        logging.info("All %d PDFs processed successfully.", mined)
 
 
     Failedjson = output_root/"FailedMines.json"
-    Failedjson.write_text(json.dumps(FailedDict, ensure_ascii=False, indent=2), encoding="utf-8")
+    Failedjson.write_bytes(orjson.dumps(FailedDict, option=_JSON_OPTS))
     NoGrobjson = output_root/"NoGroBid.json"
-    NoGrobjson.write_text(json.dumps(NoGroBiD, ensure_ascii=False, indent=2), encoding="utf-8")
+    NoGrobjson.write_bytes(orjson.dumps(NoGroBiD, option=_JSON_OPTS))
 
 
     # Print overall elapsed time
@@ -196,6 +287,14 @@ def main(argv=None):
         "-w", "--workers", type=int, default=4,
         help="Number of parallel worker processes"
     )
+    parser.add_argument(
+        "-c", "--chunksize", type=int, default=1,
+        help="PDFs handed to a worker at once (raise for many small PDFs)"
+    )
+    parser.add_argument(
+        "-g", "--grobid-workers", type=int, default=None,
+        help="Worker processes for the GroBiD stage (default: same as --workers)"
+    )
     parser.add_argument(
         "-ll", "--log-level", default="INFO",
         help="Logging level (DEBUG, INFO, WARNING, ERROR)"
@@ -215,6 +314,8 @@ def main(argv=None):
         workers=args.workers,
         recursive=args.recursive,
         log_level=args.log_level,
+        chunksize=args.chunksize,
+        grobid_workers=args.grobid_workers,
     )
 
 if __name__ == "__main__":
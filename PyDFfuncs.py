@@ -6,19 +6,36 @@ import logging
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+def _read_info_key(file_path: str, key: str):
+    """
+    Read one key of the PDF Info dict with PyMuPDF: only the trailer and the
+    Info object are resolved, no pypdf object model is built.
+    Returns (found_info, value); falls back to pypdf for a direct (inline) Info dict.
+    """
+    with pymupdf.open(file_path) as doc:
+        typ, info = doc.xref_get_key(-1, "Info")
+        if typ == "xref":
+            typ, val = doc.xref_get_key(int(info.split()[0]), key)
+            return True, (val if typ == "string" else None)
+        if typ == "null":
+            return False, None
+    with open(file_path, "rb") as pdf:
+        pdf_metadata = PdfReader(pdf).metadata
+    if not pdf_metadata:
+        return False, None
+    return True, pdf_metadata.get(f"/{key}")
+
+
 def get_pdf_arnum(file_path: str, pdf_file: str):
-    """Extract PDF metadata using PyPDF."""
+    """Extract the IEEE Article ID from the PDF metadata."""
     logging.debug(f"Processing: {pdf_file}")
     try:
-        with open(file_path, "rb") as pdf:
-            reader = PdfReader(pdf)
-            pdf_metadata =  reader.metadata
+        has_metadata, arNum = _read_info_key(file_path, "IEEE Article ID")
 
-        if not pdf_metadata:
+        if not has_metadata:
             logging.warning(f"No metadata found for: {pdf_file}")
             return None
 
-        arNum = pdf_metadata.get('/IEEE Article ID')
         if not arNum:
             logging.warning(f"No IEEE Article ID in metadata for: {pdf_file}")
             return None
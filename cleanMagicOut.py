@@ -1,4 +1,4 @@
-import re, unicodedata
+import re
 from ParseMagicJSONfuncs import save_json, load_json
 from pylatexenc.latex2text import LatexNodes2Text
 # Substrings to match (case-insensitive)
@@ -11,58 +11,66 @@ phrases = [
     "Authorized licensed use"
 ]
 
+# every "bad entry" signal in one alternation, so each text is scanned once:
+# phrases | ISBN (case-sensitive, as before) | © <year> IEEE | <year> IEEE
+_BAD_RE = re.compile(
+    "|".join(re.escape(p) for p in phrases)
+    + r'|(?-i:ISBN\s+\d{1,5}-\d{1,7}-\d{1,7}-\d{1,7}-\d{1})'
+    + r'|©\s*\d{4}\s*IEEE'
+    + r'|\b\d{4}\b\s*IEEE',
+    re.IGNORECASE,
+)
 
 
 
-def clean_inline_formel(txt: str):
-    converter = LatexNodes2Text(
-        math_mode='verbatim',
-        keep_braced_groups=False
-    )
 
-    def clean_latex_formula(match):
-        latex_expr = match.group(1)
-        # Remove spaces after opening brace and before closing brace
-        latex_expr= re.sub(r'\{\s+', '{', latex_expr)
-        latex_expr= re.sub(r'\s+\}', '}', latex_expr)
+# $…$ spans and the whitespace clean-up steps for the formula inside them
+_DOLLAR_RE = re.compile(r'\$(.*?)\$')
+_BRACE_OPEN_RE = re.compile(r'\{\s+')
+_BRACE_CLOSE_RE = re.compile(r'\s+\}')
+_CMD_SPACE_RE = re.compile(r'\\\s+')
+_SPACE_CMD_RE = re.compile(r'\s+\\')
+_LOOSE_SPACE_RE = re.compile(r'(?<![\\\+\-\*/=])\s+(?![\\\+\-\*/=])')
+# Unicode space separators (category Zs) → plain space
+_ZS_TABLE = str.maketrans(dict.fromkeys('\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006'
+                                        '\u2007\u2008\u2009\u200a\u202f\u205f\u3000', ' '))
+
+
+# one converter per process: the constructor builds pylatexenc's macro tables
+_LATEX_CONVERTER = LatexNodes2Text(
+    math_mode='verbatim',
+    keep_braced_groups=False
+)
+
+
+def clean_latex_formula(latex_expr):
+    # Remove spaces after opening brace and before closing brace
+    latex_expr = _BRACE_OPEN_RE.sub('{', latex_expr)
+    latex_expr = _BRACE_CLOSE_RE.sub('}', latex_expr)
 
-        # match spaces after backslash (LaTeX command)
-        latex_expr= re.sub(r'\\\s+', r'', latex_expr)
-        latex_expr = re.sub(r'\s+\\', r'\\', latex_expr)
+    # match spaces after backslash (LaTeX command)
+    latex_expr = _CMD_SPACE_RE.sub('', latex_expr)
+    latex_expr = _SPACE_CMD_RE.sub(r'\\', latex_expr)
 
-        # match spaces NOT after operators or LaTeX commands
-        latex_expr= re.sub(r'(?<![\\\+\-\*/=])\s+(?![\\\+\-\*/=])', '', latex_expr)
-        #latex_expr = re.sub(r'\\s+', '', latex_expr)
+    # match spaces NOT after operators or LaTeX commands
+    latex_expr = _LOOSE_SPACE_RE.sub('', latex_expr)
+    #latex_expr = re.sub(r'\\s+', '', latex_expr)
 
-        return latex_expr
+    return latex_expr
 
-    def replacer(match):
-        latex_expr = match.group(1)
-        return f"${converter.latex_to_text(latex_expr)}$"
 
-    def normalize_spaces(text):
-        return ''.join(' ' if unicodedata.category(c) == 'Zs' else c for c in text)
+def _formel_replacer(match):
+    # convert, then clean, each $…$ span in the same pass (delimiters are dropped)
+    return clean_latex_formula(_LATEX_CONVERTER.latex_to_text(match.group(1)))
 
-    txt = re.sub(r'\$(.*?)\$', replacer, txt)
-    txt = re.sub(r'\$(.*?)\$', clean_latex_formula, txt)
-    txt = normalize_spaces(txt)
-    return txt
+
+def clean_inline_formel(txt: str):
+    txt = _DOLLAR_RE.sub(_formel_replacer, txt)
+    return txt.translate(_ZS_TABLE)
 
 # Filter function
 def is_bad_entry(entry):
-    # Compile regex for faster matching
-    phrase_pattern = re.compile("|".join(re.escape(p) for p in phrases), re.IGNORECASE)
-    isbn_pattern = re.compile(r'ISBN\s+\d{1,5}-\d{1,7}-\d{1,7}-\d{1,7}-\d{1}')
-    copyright_pattern = re.compile(r'©\s*\d{4}\s*IEEE', re.IGNORECASE)
-    year_ieee_pattern = re.compile(r'\b\d{4}\b\s*IEEE', re.IGNORECASE)
-
-    text = entry.get('text', '')
-    return (
-        phrase_pattern.search(text) or
-        isbn_pattern.search(text) or
-        copyright_pattern.search(text) or
-        year_ieee_pattern.search(text)
-    )
+    return _BAD_RE.search(entry.get('text', '')) is not None
 def combine_dicts(prev: dict, nexter: dict):
     prev_text = prev['text']
     next_text = nexter['text']
@@ -76,33 +84,42 @@ def combine_dicts(prev: dict, nexter: dict):
         return nu_entry
     return None
 
+def _is_body_text(entry: dict) -> bool:
+    return entry.get('type') == 'text' and not entry.get('text_level')
+
 def clean_bad_entry(data: list[dict]) -> list[dict]:
     filtered_data = []
-    nu_idx = 0
+    last_text = None        # position in filtered_data of the last body-text entry
+    consumed = set()        # data indices already merged into an earlier entry
+    bad = [is_bad_entry(entry) for entry in data]
+    n = len(data)
+    fwd = 0                 # everything before fwd is not mergeable text, or consumed
     for idx, entry in enumerate(data):
-        if not is_bad_entry(entry):
+        if idx in consumed:
+            continue
+        if not bad[idx]:
             if entry.get('type') == 'text':
                 if '\n' in entry.get('text'):
                     entry['text'] = entry['text'].replace('\n', '')
                     entry['text'] =  re.sub(r'\s+', r' ', entry['text'])
                 entry['text'] = clean_inline_formel(entry['text'])
-
+                if not entry.get('text_level'):
+                    last_text = len(filtered_data)
 
             filtered_data.append(entry)
-            nu_idx += 1
-        else:
-            prev_entry = next(item for item in reversed(filtered_data[:nu_idx+1]) if item.get('type') == 'text' and not item.get('text_level'))
-            #print(prev_entry['text'].replace('\n', ''))
-            next_entry = next(item for item in (data[idx+1:]) if item.get('type') == 'text' and not item.get('text_level'))
-            #print(next_entry)
-            nu_entry = combine_dicts(prev_entry, next_entry)
+        elif last_text is not None:
+            # a bad entry (page header/footer) may split a paragraph: glue the next
+            # clean body text back on (never another bad entry)
+            fwd = max(fwd, idx + 1)
+            while fwd < n and (fwd in consumed or bad[fwd] or not _is_body_text(data[fwd])):
+                fwd += 1
+            if fwd == n:
+                continue
+            nu_entry = combine_dicts(filtered_data[last_text], data[fwd])
             if nu_entry:
                 #print(nu_entry)
-                id = filtered_data.index(prev_entry)
-                #filtered_data.remove(prev_entry)
-                filtered_data[id]['text'] = nu_entry['text']
-                data.remove(next_entry)
-    filtered_data = [entry for entry in data if not is_bad_entry(entry)]
+                filtered_data[last_text]['text'] = nu_entry['text']
+                consumed.add(fwd)
     return filtered_data
 # Filter the list
 
@@ -1,44 +1,83 @@
 import re
+import string
 from pylatexenc.latex2text import LatexNodes2Text
 
+# convert_html_tags
+_RE_SUB = re.compile(r'<sub[^>]*>(.*?)</sub>')
+_RE_SUP = re.compile(r'<sup[^>]*>(.*?)</sup>')
+_RE_TAG = re.compile(r'<[^>]+>')
+# normalize_malformed_latex
+_RE_HBOX = re.compile(r'\\(hbox|tag)\{\(\d+\)\}')
+# the multi-char replacements in one alternation, ahead of the bare '&' deletion
+_MULTI_MAP = {
+    r'\over': '/',
+    r'\$': '$',
+    r'\cr': '\n',            # line break in alignments
+    r'\ll': '<<',             # much less than
+    r'\eqalignno{': '',       # remove alignment wrappers
+}
+# equation label ending '}&' → ')', also when only removed wrappers sit between
+_RE_MULTI = re.compile(r'\}(?:\\eqalignno\{)*&|' + '|'.join(map(re.escape, _MULTI_MAP)))
+_AMP_TABLE = str.maketrans('', '', '&')   # clean up alignment symbols
+_RE_CMDS = re.compile(r'(?<!\\)(text|frac|sqrt|sum|int|lim|log|sin|cos|tan|hbox|mu|ohm|omega)')
+# convert_latex_math
+_RE_FRAC = re.compile(r'\\frac\s*\{(.*?)\}\s*\{(.*?)\}')
+_RE_SQRT = re.compile(r'\\sqrt\s*\{(.*?)\}')
+_RE_TEXT = re.compile(r'\\text\{([^}]*)\}')
+_RE_SUPBRACE = re.compile(r'\^\{(.*?)\}')
+_RE_SUBBRACE = re.compile(r'_\{(.*?)\}')
+_RE_SUPCHAR = re.compile(r'\^([^\s_])')
+_RE_SUBCHAR = re.compile(r'_([^\s^])')
+# latex_to_text final cleanup: braces → parens, then any run of leftover commands
+# and whitespace in one pass (' ' if the run had whitespace, else dropped)
+_BRACE_TABLE = str.maketrans('{}', '()')
+_RE_FINAL = re.compile(r'(?:\\[a-zA-Z]+|\s)+')
+_CMD_CHARS = '\\' + string.ascii_letters
+# one converter per process: the constructor builds pylatexenc's macro tables
+_CONVERTER = LatexNodes2Text(
+    math_mode='text',
+    keep_braced_groups=True
+)
+
 def convert_html_tags(text):
     # <sub> to _value and <sup> to ^value
-    text = re.sub(r'<sub[^>]*>(.*?)</sub>', r'_\1', text)
-    text = re.sub(r'<sup[^>]*>(.*?)</sup>', r'^\1', text)
+    text = _RE_SUB.sub(r'_\1', text)
+    text = _RE_SUP.sub(r'^\1', text)
     # Remove any remaining tags
-    return re.sub(r'<[^>]+>', '', text)
+    return _RE_TAG.sub('', text)
+
+
+def _multi_repl(m):
+    tok = m.group(0)
+    return ')' if tok[-1] == '&' else _MULTI_MAP[tok]
 
 
 def normalize_malformed_latex(text):
-    text = text.replace(r'\over', '/')
-    text = re.sub(r'\\(hbox|tag)\{\(\d+\)\}', '', text)
-    text = text.replace(r'\$', '$')
-    text = text.replace(r'\cr', '\n')  # line break in alignments
-    text = text.replace(r'\ll', '<<')  # much less than
-    text = text.replace(r'\eqalignno{', '')  # remove alignment wrappers
-    text = text.replace(r'}&', ')')  # equation label ending
-    text = text.replace(r'&', '')    # clean up alignment symbols
-    text = re.sub(
-        r'(?<!\\)(text|frac|sqrt|sum|int|lim|log|sin|cos|tan|hbox|mu|ohm|omega)',
-        r'\\\1', text
-    )
+    text = _RE_HBOX.sub('', text)
+    text = _RE_MULTI.sub(_multi_repl, text).translate(_AMP_TABLE)
+    text = _RE_CMDS.sub(r'\\\1', text)
     return text
 
 def convert_latex_math(text):
     # Convert \frac{a}{b} → (a) / (b)
-    text = re.sub(r'\\frac\s*\{(.*?)\}\s*\{(.*?)\}', r'(\1) / (\2)', text)
+    text = _RE_FRAC.sub(r'(\1) / (\2)', text)
     # Convert \sqrt{a} → sqrt(a)
-    text = re.sub(r'\\sqrt\s*\{(.*?)\}', r'sqrt(\1)', text)
+    text = _RE_SQRT.sub(r'sqrt(\1)', text)
     # \text{g} → g
-    text = re.sub(r'\\text\{([^}]*)\}', r'\1', text)
+    text = _RE_TEXT.sub(r'\1', text)
 
     # Handle superscripts and subscripts
-    text = re.sub(r'\^\{(.*?)\}', r'^\1', text)
-    text = re.sub(r'_\{(.*?)\}', r'_\1', text)
-    text = re.sub(r'\^([^\s_])', r'^\1', text)
-    text = re.sub(r'_([^\s^])', r'_\1', text)
+    text = _RE_SUPBRACE.sub(r'^\1', text)
+    text = _RE_SUBBRACE.sub(r'_\1', text)
+    text = _RE_SUPCHAR.sub(r'^\1', text)
+    text = _RE_SUBCHAR.sub(r'_\1', text)
     return text
 
+def _final_repl(m):
+    # a run made only of commands is removed; one containing whitespace collapses
+    # to a single space, as removing the commands first and then \s+ → ' ' would
+    return ' ' if m.group(0).strip(_CMD_CHARS) else ''
+
 def latex_to_text(latex_str):
     # Step 1: HTML <sub> and <sup> if present
     malaligned_match = r'\\$[^$]+\\$'
@@ -46,18 +85,13 @@ def latex_to_text(latex_str):
     latex_str = convert_html_tags(latex_str)
 
     # Step 2: Use pylatexenc to convert most of the structure
-    converter = LatexNodes2Text(
-        math_mode='text',
-        keep_braced_groups=True
-    )
-    text = converter.latex_to_text(latex_str)
+    text = _CONVERTER.latex_to_text(latex_str)
 
     # Step 3: Manually fix math constructs not handled
     text = convert_latex_math(text)
 
     # Step 4: Final cleanup
-    text = text.replace('{', '(').replace('}', ')')
-    text = re.sub(r'\\[a-zA-Z]+', '', text)  # remove leftover commands
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = text.translate(_BRACE_TABLE)
+    text = _RE_FINAL.sub(_final_repl, text).strip()
 
     return text
@@ -1,8 +1,9 @@
-import json
-import statistics
+import os
+import ijson
 from pathlib import Path
-from shapely.geometry import box
+import numpy as np
 from rtree import index
+from ParseMagicJSONfuncs import loads_json, save_json
 
 # —————————————————————————————————————————————
 # 1. Load both JSON files
@@ -11,8 +12,9 @@ from rtree import index
 pdf_dict_path    = Path("pdf_dict.json")
 middle_json_path = Path("6H-SiC JFETs for 450 °C Differential Sensing Applications_middle.json")
 
-pdf_lines = json.loads(pdf_dict_path.read_text())["Lines"]
-middle    = json.loads(middle_json_path.read_text())
+# PyMuPDF lines are only walked once (step 3), where they are streamed instead
+# of loading pdf_dict whole. middle has to be loaded whole, it is written back in step 4.
+middle    = loads_json(middle_json_path.read_bytes())
 
 # We assume middle["pdf_info"][0]["preproc_blocks"] exists
 blocks = middle["pdf_info"][0]["preproc_blocks"]
@@ -27,129 +29,145 @@ for i, blk in enumerate(blocks):
     bb = tuple(blk["bbox"])  # [x0, y0, x1, y1]
     block_boxes.append((bb, i))
 
-# Build R-tree
-block_idx = index.Index()
-for i, (bb, _) in enumerate(block_boxes):
-    block_idx.insert(i, bb)
-
-# Helper to compute IoU between two bboxes
-def iou(a, b):
-    A = box(*a)
-    B = box(*b)
-    inter = A.intersection(B).area
-    if inter == 0:
-        return 0.0
-    return inter / (A.area + B.area - inter)
+# Build R-tree: bulk-loaded from a stream (one pass, tighter nodes than
+# one insert per block). rtree rejects an empty stream, hence the guard.
+def _stream():
+    for i, (bb, _) in enumerate(block_boxes):
+        yield (i, bb, None)
+
+block_idx = index.Index(_stream()) if block_boxes else index.Index()
+
+# Same boxes as an (N, 4) array, row i = block i, for the vectorised IoU
+block_bboxes = np.asarray([blk["bbox"] for blk in blocks], dtype=np.float64).reshape(-1, 4)
+
+# IoU of every row of boxes (N, 4) with bbox b. All boxes are axis-aligned,
+# so the overlap is plain min/max arithmetic, no polygon intersection needed.
+def iou(boxes, b):
+    iw = np.clip(np.minimum(boxes[:, 2], b[2]) - np.maximum(boxes[:, 0], b[0]), 0, None)
+    ih = np.clip(np.minimum(boxes[:, 3], b[3]) - np.maximum(boxes[:, 1], b[1]), 0, None)
+    inter = iw * ih
+    area_a = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    # no overlap → 0.0, also for degenerate (zero-area) boxes
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(inter > 0, inter / (area_a + area_b - inter), 0.0)
 
 # —————————————————————————————————————————————
 # 3. For each PyMuPDF line, reconcile with existing blocks/lines
 # —————————————————————————————————————————————
 
-for pdf_line in pdf_lines:
-    pbbox = tuple(pdf_line["bbox"])
-    ptext = pdf_line["text"]
-
-    # 3A) Find candidate blocks whose bbox overlaps pbbox
-    candidate_block_ids = list(block_idx.intersection(pbbox))
-    # Keep only those with IoU ≥ 0.5
-    cand_blocks = []
-    for bid in candidate_block_ids:
-        bbb, blk_idx = block_boxes[bid]
-        score = iou(pbbox, bbb)
-        if score >= 0.5:
-            cand_blocks.append((blk_idx, score))
-    if not cand_blocks:
-        # No existing block overlaps this line → SKIP (do NOT create a new block)
-        continue
-    print(cand_blocks)
-
-    # 3B) Choose the block with highest IoU
-    cand_blocks.sort(key=lambda x: x[1], reverse=True)
-    chosen_blk_idx = cand_blocks[0][0]
-    blk = blocks[chosen_blk_idx]
-
-    # 3C) Within this block, look for overlapping “lines”
-    mid_lines = blk.get("lines", [])
-
-    # Build a small list of (mid_line_bbox, line_index_in_block)
-    mid_line_boxes = [(tuple(ln["bbox"]), idx) for idx, ln in enumerate(mid_lines)]
-
-    # For each mid‐line, compute IoU with pdf_line
-    overlapping_line_ids = []
-    for ml_bbox, ml_idx in mid_line_boxes:
-        if iou(pbbox, ml_bbox) >= 0.5:
-            overlapping_line_ids.append(ml_idx)
-
-    if len(overlapping_line_ids) == 1:
-        # 3C1) Exactly one existing line matches → overwrite its text & bbox
-        ln_idx = overlapping_line_ids[0]
-        target = mid_lines[ln_idx]
-        target["bbox"] = list(pbbox)
-        # Replace all spans with a single span containing ptext
-        target["spans"] = [{
-            "bbox": list(pbbox),
-            "content": ptext,
-            "type": "text",
-            "score": 1.0
-        }]
-
-    elif len(overlapping_line_ids) > 1:
-        # 3C2) Multiple middle‐lines likely all pieces of one true line → MERGE
-        # Pick the first as “master,” merge others into it
-        master_idx = overlapping_line_ids[0]
-        master = mid_lines[master_idx]
-
-        # Compute new merged bbox = union of all involved mid‐line bboxes, but
-        # we want exactly the pdf_line’s bbox, so just set to pbbox
-        master["bbox"] = list(pbbox)
-
-        # Overwrite spans
-        master["spans"] = [{
-            "bbox": list(pbbox),
-            "content": ptext,
-            "type": "text",
-            "score": 1.0
-        }]
-
-        # Remove all other duplicates from block
-        # (remove in descending order so indexes remain valid)
-        for dup_idx in sorted(overlapping_line_ids[1:], reverse=True):
-            mid_lines.pop(dup_idx)
-
-    else:
-        # 3C3) No matching mid‐line → we must INSERT a new line into the existing block
-        # Create a new “line” object that matches the same schema
-        new_line = {
-            "bbox": list(pbbox),
-            "spans": [{
+# block index → (M, 4) array of its line bboxes, built on first touch and then
+# updated in step with blk["lines"] instead of being rebuilt for every pdf_line
+line_boxes = {}
+
+with open(pdf_dict_path, "rb") as pdf_dict_file:
+    for pdf_line in ijson.items(pdf_dict_file, "Lines.item", use_float=True):
+        pbbox = tuple(pdf_line["bbox"])
+        ptext = pdf_line["text"]
+
+        # 3A) Find candidate blocks whose bbox overlaps pbbox
+        # (sorted: the tree's result order depends on how it was built)
+        candidate_block_ids = np.sort(np.fromiter(block_idx.intersection(pbbox), dtype=np.int64))
+        # Keep only those with IoU ≥ 0.5
+        scores = iou(block_bboxes[candidate_block_ids], pbbox)
+        keep = scores >= 0.5
+        if not keep.any():
+            # No existing block overlaps this line → SKIP (do NOT create a new block)
+            continue
+        cand_ids, cand_scores = candidate_block_ids[keep], scores[keep]
+
+        # 3B) Choose the block with highest IoU (lowest block index on ties)
+        chosen_blk_idx = int(cand_ids[np.argmax(cand_scores)])
+        blk = blocks[chosen_blk_idx]
+
+        # 3C) Within this block, look for overlapping “lines”
+        mid_lines = blk.get("lines", [])
+        mid_line_boxes = line_boxes.get(chosen_blk_idx)
+        if mid_line_boxes is None:
+            mid_line_boxes = np.asarray([ln["bbox"] for ln in mid_lines], dtype=np.float64).reshape(-1, 4)
+
+        # IoU of every mid‐line with pdf_line at once
+        overlapping_line_ids = np.flatnonzero(iou(mid_line_boxes, pbbox) >= 0.5).tolist()
+
+        if len(overlapping_line_ids) == 1:
+            # 3C1) Exactly one existing line matches → overwrite its text & bbox
+            ln_idx = overlapping_line_ids[0]
+            target = mid_lines[ln_idx]
+            target["bbox"] = list(pbbox)
+            mid_line_boxes[ln_idx] = pbbox
+            # Replace all spans with a single span containing ptext
+            target["spans"] = [{
                 "bbox": list(pbbox),
                 "content": ptext,
                 "type": "text",
                 "score": 1.0
-            }],
-            # Optionally assign an “index” field. If you need the new line
-            # to fit into an existing index ordering you can do something like:
-            # "index": (max(existing_indexes)+1)
-        }
-
-        # Insert it so that blk["lines"] remains sorted by y0 ascending.
-        # Compute y0 for each existing line and for the new line, then insert.
-        new_y0 = pbbox[1]
-        insert_pos = 0
-        for idx_existing, ln in enumerate(mid_lines):
-            existing_y0 = ln["bbox"][1]
-            if existing_y0 > new_y0:
-                break
-            insert_pos += 1
-        mid_lines.insert(insert_pos, new_line)
-
-        # Done. (No change to blocks list itself.)
+            }]
+
+        elif len(overlapping_line_ids) > 1:
+            # 3C2) Multiple middle‐lines likely all pieces of one true line → MERGE
+            # Pick the first as “master,” merge others into it
+            master_idx = overlapping_line_ids[0]
+            master = mid_lines[master_idx]
+
+            # Compute new merged bbox = union of all involved mid‐line bboxes, but
+            # we want exactly the pdf_line’s bbox, so just set to pbbox
+            master["bbox"] = list(pbbox)
+            mid_line_boxes[master_idx] = pbbox
+
+            # Overwrite spans
+            master["spans"] = [{
+                "bbox": list(pbbox),
+                "content": ptext,
+                "type": "text",
+                "score": 1.0
+            }]
+
+            # Remove all other duplicates from block
+            # (remove in descending order so indexes remain valid)
+            for dup_idx in sorted(overlapping_line_ids[1:], reverse=True):
+                mid_lines.pop(dup_idx)
+            mid_line_boxes = np.delete(mid_line_boxes, overlapping_line_ids[1:], axis=0)
+
+        else:
+            # 3C3) No matching mid‐line → we must INSERT a new line into the existing block
+            # Create a new “line” object that matches the same schema
+            new_line = {
+                "bbox": list(pbbox),
+                "spans": [{
+                    "bbox": list(pbbox),
+                    "content": ptext,
+                    "type": "text",
+                    "score": 1.0
+                }],
+                # Optionally assign an “index” field. If you need the new line
+                # to fit into an existing index ordering you can do something like:
+                # "index": (max(existing_indexes)+1)
+            }
+
+            # Insert it so that blk["lines"] remains sorted by y0 ascending: before the
+            # first line whose y0 is greater (after equal y0), else at the end.
+            # The y0s are NOT guaranteed sorted (MinerU's order, plus earlier bbox
+            # overwrites in this pass), so no binary search: one vectorised scan over
+            # the block's cached line y0s, which is exactly the first-greater rule.
+            new_y0 = pbbox[1]
+            greater = np.flatnonzero(mid_line_boxes[:, 1] > new_y0)
+            insert_pos = int(greater[0]) if greater.size else len(mid_lines)
+            mid_lines.insert(insert_pos, new_line)
+            mid_line_boxes = np.insert(mid_line_boxes, insert_pos, pbbox, axis=0)
+
+            # Done. (No change to blocks list itself.)
+
+        if "lines" in blk:                  # (a block without "lines" gets nothing stored)
+            line_boxes[chosen_blk_idx] = mid_line_boxes
 
 # —————————————————————————————————————————————
 # 4. Save the “fixed” middle.json
 # —————————————————————————————————————————————
 
 fixed_path = Path("6H-SiC JFETs for 450 °C Differential Sensing Applications_middle_FIXED.json")
-fixed_path.write_text(json.dumps(middle, indent=2))
+# write next to it first, then rename: a crash mid-write never leaves a truncated file
+tmp_path = fixed_path.with_suffix(".tmp")
+save_json(middle, tmp_path)
+os.replace(tmp_path, fixed_path)
 
 print(f"Saved updated file to {fixed_path!r}")
@@ -1,16 +1,22 @@
-import argparse, json, logging, pathlib, os
+import argparse, logging, pathlib, os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from tqdm import tqdm
 from grobidParseFuncs import _post_pdf, _tei_refs_to_ieee_json, _tei_header_to_ieee_json
 from typing import Optional, Tuple, Dict, Any, List
 from pre_ocr import _byte_ocr
+from ParseMagicJSONfuncs import save_json
 
 def grobid_process(pdf_path: pathlib.Path,
                    grobid_url: str,
                    out_dir: pathlib.Path,
                    full_dump: bool = True,
-                   all_dump: bool = False) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
-    """Send one PDF to Grobid, save TEI + JSON in out_dir."""
+                   all_dump: bool = False,
+                   source_file: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    Send one PDF to Grobid, save TEI + JSON in out_dir.
+    source_file: pdf_path already resolved by the driver; resolved here only if not given.
+    """
     t0 = datetime.now()
 
     logging.info("🟡  %s – start", pdf_path.name)
@@ -25,44 +31,51 @@ def grobid_process(pdf_path: pathlib.Path,
         logging.error("❌  %s – cannot read PDF: %s", pdf_path.name, exc)
         return None
 
-    # 2) header endpoint
-    try:
-        header_xml = _post_pdf(
-            pdf_bytes,
-            f"{grobid_url}/api/processHeaderDocument",
-            consolidate="consolidateHeader",
-        )
-        if full_dump and all_dump:
-            header_file = out_dir / f"{pdf_path.stem}.header.tei.xml"
-            header_file.write_text(header_xml, encoding="utf-8")
-            logging.debug("Saved header TEI → %s", header_file)
-    except Exception as exc:
-        logging.error("❌  %s – header extraction failed: %s", pdf_path.name, exc)
-
-    # 3) references endpoint
-    try:
-        refs_xml = _post_pdf(
+    # 2) + 3) both endpoints at once: the references request runs on a helper
+    #        thread while this one waits on the header, so the round-trips overlap
+    with ThreadPoolExecutor(max_workers=1) as tpool:
+        fut_refs = tpool.submit(
+            _post_pdf,
             pdf_bytes,
             f"{grobid_url}/api/processReferences",
             consolidate="includeRawCitations",
         )
-        if full_dump and all_dump:
-            refs_file = out_dir / f"{pdf_path.stem}.references.tei.xml"
-            refs_file.write_text(refs_xml, encoding="utf-8")
-            logging.debug("Saved references TEI → %s", refs_file)
-    except Exception as exc:
-        logging.error("❌  %s – reference extraction failed: %s", pdf_path.name, exc)
+
+        # 2) header endpoint
+        try:
+            header_xml = _post_pdf(
+                pdf_bytes,
+                f"{grobid_url}/api/processHeaderDocument",
+                consolidate="consolidateHeader",
+            )
+            if full_dump and all_dump:
+                header_file = out_dir / f"{pdf_path.stem}.header.tei.xml"
+                header_file.write_bytes(header_xml)
+                logging.debug("Saved header TEI → %s", header_file)
+        except Exception as exc:
+            logging.error("❌  %s – header extraction failed: %s", pdf_path.name, exc)
+
+        # 3) references endpoint
+        try:
+            refs_xml = fut_refs.result()
+            if full_dump and all_dump:
+                refs_file = out_dir / f"{pdf_path.stem}.references.tei.xml"
+                refs_file.write_bytes(refs_xml)
+                logging.debug("Saved references TEI → %s", refs_file)
+        except Exception as exc:
+            logging.error("❌  %s – reference extraction failed: %s", pdf_path.name, exc)
 
     # 4) TEI → JSON transformation
     try:
-        doc = {"source_file": str(pdf_path.resolve())}
         dict_header = _tei_header_to_ieee_json(header_xml)
         refs_dict = _tei_refs_to_ieee_json(refs_xml)
-        doc = {"source_file": str(pdf_path.resolve()), **dict_header, "bibliographical references": refs_dict}
 
         if full_dump:
+            # only the dump needs the combined doc (and the resolved path)
+            doc = {"source_file": source_file or str(pdf_path.resolve()),
+                   **dict_header, "bibliographical references": refs_dict}
             json_file = out_dir / f"{pdf_path.stem}.json"
-            json_file.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+            save_json(doc, json_file)
             logging.info("✅  %s – JSON saved → %s  (%.2f s)",
                      pdf_path.name, json_file, (datetime.now() - t0).total_seconds())
         return dict_header, refs_dict
@@ -1,81 +1,130 @@
 # grobidParseFuncs.py   (lxml version)
 import requests, logging
+from io import BytesIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from lxml import etree as ET
 
 # ──────────────────────────────────────────────────────────────
 # 0  Constants & tiny helpers
 # ──────────────────────────────────────────────────────────────
 TEI_NS = {"tei": "http://www.tei-c.org/ns/1.0"}
+_TEI_BIBLSTRUCT = "{http://www.tei-c.org/ns/1.0}biblStruct"
+_TEI_LISTBIBL   = "{http://www.tei-c.org/ns/1.0}listBibl"
+
+# one keep-alive session per process (pool workers each import their own);
+# a busy Grobid answers 503 before doing any work, so only POSTs that got a 503
+# are retried (with backoff), over http:// and https:// alike. Connection errors
+# and read timeouts are not retried: a slow job may still be running server-side
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    max_retries=Retry(total=None, connect=0, read=False, other=0, redirect=0,
+                      status=3, backoff_factor=0.2, status_forcelist=[503],
+                      allowed_methods=frozenset({"POST"})))
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+def _xp(expr: str) -> ET.XPath:
+    return ET.XPath(expr, namespaces=TEI_NS)
+
+# compiled once per process instead of on every .xpath() call
+# (relative ones are evaluated against the author / <monogr> / <biblStruct> node)
+# forename text nodes and the first surname element, in one evaluation
+_XP_NAME_PARTS = _xp("tei:persName/tei:forename/text() | (tei:persName/tei:surname)[1]")
+_XP_CONF_LOC   = _xp("string(.//tei:meeting//tei:addrLine | .//tei:meeting//tei:settlement)")
+_XP_VOLUME     = _xp("string(.//tei:biblScope[@unit='volume'])")
+_XP_PAGE_FROM  = _xp("string(.//tei:biblScope[@unit='page']/@from)")
+_XP_PAGE_TO    = _xp("string(.//tei:biblScope[@unit='page']/@to)")
+
+# header
+_XP_TITLE      = _xp("string(.//tei:titleStmt/tei:title[@level='a'][@type='main'])")
+_XP_DOI        = _xp("string(.//tei:idno[@type='DOI'])")
+# publication date can sit in <publicationStmt> *or* <imprint>
+_XP_DATE       = _xp("string((.//tei:publicationStmt/tei:date "
+                     "| .//tei:imprint/tei:date)[1])")
+_XP_DATE_WHEN  = _xp("string((.//tei:publicationStmt/tei:date "
+                     "| .//tei:imprint/tei:date)[1]/@when)")
+_XP_PUBLISHER  = _xp("string((.//tei:publicationStmt/tei:publisher "
+                     "| .//tei:imprint/tei:publisher)[1])")
+_XP_AUTHORS    = _xp(".//tei:analytic/tei:author")
+_XP_MONOGR     = _xp(".//tei:monogr")
+_XP_PUB_TITLE  = _xp("string(tei:title[@level='j' or @level='m'][1])")
+_XP_ABSTRACT   = _xp("string(.//tei:abstract)")
+
+# references
+_XP_REF_TITLE  = _xp("string(./tei:analytic/tei:title[@level='a'][@type='main'] "
+                     "| ./tei:analytic/tei:title[1])")
+_XP_REF_AUTHORS = _xp("./tei:analytic/tei:author")
+_XP_SOURCE     = _xp("string(./tei:monogr/tei:title[1])")
+_XP_ISSUE      = _xp("string(.//tei:biblScope[@unit='issue'])")
+_XP_YEAR_WHEN  = _xp("string(.//tei:date/@when)")
+_XP_YEAR_TEXT  = _xp("string(.//tei:date)")
+_XP_RAW        = _xp("string(./tei:note[@type='raw_reference'])")
+
+def _author_name(author) -> str:
+    """'<forenames> <surname>' of a tei:author node (forenames first, as before)."""
+    forenames, surname = [], ""
+    for part in _XP_NAME_PARTS(author):
+        if isinstance(part, str):       # forename text()
+            forenames.append(part)
+        else:                           # ≙ string(surname): all its descendant text
+            surname = "".join(part.itertext())
+    return " ".join(forenames + ([surname] if surname else [])).strip()
+
 
 def _post_pdf(pdf_bytes: bytes, endpoint: str, *, consolidate: str, timeout: int = 120,
-		extra_headers:dict | None = None) -> str:
-    """Send a PDF to one Grobid endpoint, return raw TEI XML."""
+		extra_headers:dict | None = None) -> bytes:
+    """Send a PDF to one Grobid endpoint, return the raw TEI XML bytes (parsed as-is by lxml)."""
     files = {"input": ("doc.pdf", pdf_bytes, "application/pdf")}
     data  = {consolidate: "1"}          # 1 = yes, normalise
     headers = {"Accept": "application/xml"}
     if extra_headers:
         headers.update(extra_headers)
         
-    r = requests.post(endpoint, files=files, data=data, headers=headers, timeout=timeout)
+    r = _SESSION.post(endpoint, files=files, data=data, headers=headers, timeout=timeout)
     r.raise_for_status()
-    return r.text
+    return r.content
 
 
 # ──────────────────────────────────────────────────────────────
 # 1  Header → IEEE-style JSON
 # ──────────────────────────────────────────────────────────────
-def _tei_header_to_ieee_json(tei_xml: str) -> dict:
-    root = ET.fromstring(tei_xml.encode())       # <TEI …>
+def _tei_header_to_ieee_json(tei_xml: bytes) -> dict:
+    root = ET.fromstring(tei_xml)       # <TEI …>
 
     # ---------- basic scalars ----------
-    title = root.xpath("string(.//tei:titleStmt/tei:title[@level='a'][@type='main'])",
-                       namespaces=TEI_NS)
-    doi   = root.xpath("string(.//tei:idno[@type='DOI'])", namespaces=TEI_NS)
+    title = _XP_TITLE(root)
+    doi   = _XP_DOI(root)
 
     # publication date can sit in <publicationStmt> *or* <imprint>
-    date  = root.xpath("string((.//tei:publicationStmt/tei:date "
-                       "| .//tei:imprint/tei:date)[1])", namespaces=TEI_NS)
-    pubyear = (root.xpath("string((.//tei:publicationStmt/tei:date "
-                          "| .//tei:imprint/tei:date)[1]/@when)",
-                          namespaces=TEI_NS) or date)[:4]
+    date  = _XP_DATE(root)
+    pubyear = (_XP_DATE_WHEN(root) or date)[:4]
 
-    publisher = root.xpath("string((.//tei:publicationStmt/tei:publisher "
-                           "| .//tei:imprint/tei:publisher)[1])",
-                           namespaces=TEI_NS)
+    publisher = _XP_PUBLISHER(root)
 
     # ---------- authors ----------
     authors = []
-    for a in root.xpath(".//tei:analytic/tei:author", namespaces=TEI_NS):
-        forenames = a.xpath("tei:persName/tei:forename/text()", namespaces=TEI_NS)
-        surname   = a.xpath("string(tei:persName/tei:surname)", namespaces=TEI_NS)
-        name = " ".join(forenames + ([surname] if surname else [])).strip()
+    for a in _XP_AUTHORS(root):
+        name = _author_name(a)
         if name:
             authors.append(name)
     authors_str = ", ".join(authors)
 
     # ---------- journal / conference block ----------
-    monogr = root.xpath(".//tei:monogr", namespaces=TEI_NS)
+    monogr = _XP_MONOGR(root)
     monogr = monogr[0] if monogr else None
 
-    publication_title = (monogr.xpath("string(tei:title[@level='j' or @level='m'][1])",
-                                      namespaces=TEI_NS)
-                         if monogr is not None else "")
+    publication_title = _XP_PUB_TITLE(monogr) if monogr is not None else ""
 
-    conf_loc = (monogr.xpath("string(.//tei:meeting//tei:addrLine | "
-                             ".//tei:meeting//tei:settlement)",
-                             namespaces=TEI_NS)
-                if monogr is not None else "")
+    conf_loc = _XP_CONF_LOC(monogr) if monogr is not None else ""
     content_type = "Conferences" if conf_loc else "Journals"
     subtype      = "IEEE Conference" if conf_loc else "IEEE Journal"
 
-    volume = monogr.xpath("string(.//tei:biblScope[@unit='volume'])",
-                          namespaces=TEI_NS) if monogr is not None else ""
-    start_page = monogr.xpath("string(.//tei:biblScope[@unit='page']/@from)",
-                              namespaces=TEI_NS) if monogr is not None else ""
-    end_page   = monogr.xpath("string(.//tei:biblScope[@unit='page']/@to)",
-                              namespaces=TEI_NS) if monogr is not None else ""
+    volume = _XP_VOLUME(monogr) if monogr is not None else ""
+    start_page = _XP_PAGE_FROM(monogr) if monogr is not None else ""
+    end_page   = _XP_PAGE_TO(monogr) if monogr is not None else ""
 
-    abstract = root.xpath("string(.//tei:abstract)", namespaces=TEI_NS)
+    abstract = _XP_ABSTRACT(root)
 
 
     return {
@@ -100,47 +149,49 @@ def _tei_header_to_ieee_json(tei_xml: str) -> dict:
 # ──────────────────────────────────────────────────────────────
 # 2  References → IEEE-style dict
 # ──────────────────────────────────────────────────────────────
-def _tei_refs_to_ieee_json(tei_xml: str) -> list[dict]:
-    root = ET.fromstring(tei_xml.encode())
+def _iter_bibls(tei_xml: bytes):
+    """
+    Yield each complete listBibl/biblStruct (≙ .//tei:listBibl/tei:biblStruct)
+    while the TEI is still being parsed; once the caller is done with one it is
+    cleared and dropped, so the whole references tree never sits in memory.
+    """
+    for _, bib in ET.iterparse(BytesIO(tei_xml), tag=_TEI_BIBLSTRUCT):
+        parent = bib.getparent()
+        if parent is None or parent.tag != _TEI_LISTBIBL:
+            continue                # nested / header biblStruct: leave it to its ancestor
+        yield bib
+        bib.clear()
+        while bib.getprevious() is not None:
+            del parent[0]
+
+
+def _tei_refs_to_ieee_json(tei_xml: bytes) -> list[dict]:
     out  = []
 
-    for i, bib in enumerate(root.xpath(".//tei:listBibl/tei:biblStruct",
-                                       namespaces=TEI_NS), 1):
-        title = bib.xpath("string(./tei:analytic/tei:title[@level='a'][@type='main'] "
-                          "| ./tei:analytic/tei:title[1])",
-                          namespaces=TEI_NS)
+    for i, bib in enumerate(_iter_bibls(tei_xml), 1):
+        title = _XP_REF_TITLE(bib)
 
         # author list (many refs have only one)
         authors = []
-        for a in bib.xpath("./tei:analytic/tei:author", namespaces=TEI_NS):
-            forenames = a.xpath("tei:persName/tei:forename/text()", namespaces=TEI_NS)
-            surname   = a.xpath("string(tei:persName/tei:surname)", namespaces=TEI_NS)
-            fullname  = " ".join(forenames + ([surname] if surname else [])).strip()
+        for a in _XP_REF_AUTHORS(bib):
+            fullname  = _author_name(a)
             if fullname:
                 authors.append(fullname)
 
-        source = bib.xpath("string(./tei:monogr/tei:title[1])", namespaces=TEI_NS)
-        volume = bib.xpath("string(.//tei:biblScope[@unit='volume'])", namespaces=TEI_NS)
-        issue  = bib.xpath("string(.//tei:biblScope[@unit='issue'])",  namespaces=TEI_NS)
+        source = _XP_SOURCE(bib)
+        volume = _XP_VOLUME(bib)
+        issue  = _XP_ISSUE(bib)
 
         # pages:  prefer explicit @from/@to, otherwise text()
-        pg_from = bib.xpath("string(.//tei:biblScope[@unit='page']/@from)",
-                            namespaces=TEI_NS)
-        pg_to   = bib.xpath("string(.//tei:biblScope[@unit='page']/@to)",
-                            namespaces=TEI_NS)
+        pg_from = _XP_PAGE_FROM(bib)
+        pg_to   = _XP_PAGE_TO(bib)
         pages   = f"{pg_from}-{pg_to}" if pg_from and pg_to else ""
 
-        year = (bib.xpath("string(.//tei:date/@when)", namespaces=TEI_NS) or
-                bib.xpath("string(.//tei:date)", namespaces=TEI_NS))[:4]
+        year = (_XP_YEAR_WHEN(bib) or _XP_YEAR_TEXT(bib))[:4]
 
-        raw_text = bib.xpath(
-            "string(./tei:note[@type='raw_reference'])", namespaces=TEI_NS
-        ) or None
+        raw_text = _XP_RAW(bib) or None
 
-        conf_city = bib.xpath(
-            "string(.//tei:meeting//tei:addrLine | .//tei:meeting//tei:settlement)",
-            namespaces=TEI_NS,
-        )
+        conf_city = _XP_CONF_LOC(bib)
 
         out.append({
             "ref_id": f"ref{i}",
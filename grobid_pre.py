@@ -11,7 +11,7 @@ logging.basicConfig(
     datefmt="%H:%M:%S"
 )
 
-from grobidstart import process_grobids, process_results
+from grobidstart import process_grobids, process_results, available_cpus
 
 if __name__ == "__main__":
     DocFolds = Path(os.getenv('DiffAmp'))
@@ -27,6 +27,6 @@ if __name__ == "__main__":
         pdf_paths = list(itertools.islice((Path(k['pdf_path']) for k in json.load(f)), 10))
     logging.info(f"Starting parallel parsing on {len(pdf_paths)} PDFs.")
 
-    workers = os.cpu_count() - 1
+    workers = max(1, available_cpus() - 1)
     grob_args = pdf_paths, out_dir, workers
     process_results(process_grobids(grob_args), out_dir)
@@ -1,9 +1,16 @@
-import argparse, json, logging, os
+import argparse, logging, os
 from tqdm import tqdm
 from pathlib import Path
 from typing import Union, List
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from grobidParse import grobid_process
+from ParseMagicJSONfuncs import save_json
+
+def available_cpus() -> int:
+    """CPUs this process may run on (cgroup / taskset aware, unlike os.cpu_count())."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
 
 def process_grobids(args: tuple[List[Path], Path, int], grobid_url: str = "http://localhost:8070",
     full_dump: bool = True,
@@ -17,21 +24,36 @@ def process_grobids(args: tuple[List[Path], Path, int], grobid_url: str = "http:
     pdf_paths = inputs if isinstance(inputs, list) else [inputs]
     #pdf_paths = [Path(p) for p in paths if Path(p).is_file() and Path(p).suffix.lower() == ".pdf"]
 
-    with ProcessPoolExecutor(max_workers=workers) as pool:
-        # Set up the future tasks
-        futures = {pool.submit(grobid_process, pdf, grobid_url, output_dir, full_dump, all_dump): pdf for pdf in pdf_paths}
-
-        # Process futures as they complete
-        pbar = tqdm(as_completed(futures), total=len(pdf_paths), desc="Processing PDFs")
-        for fut in pbar:
-            pdf_path = futures[fut]
-            pbar.set_postfix_str(pdf_path.name, refresh=True)
-            try:
-                result = fut.result()
-                if not result:
-                    failed_results.append(pdf_path)
-            except Exception as e:
-                logging.error("❌  Error processing future for %s: %s", pdf_path.name, e)
+    # redraws are rate-limited by tqdm itself; the postfix just rides along
+    pbar = tqdm(total=len(pdf_paths), desc="Processing PDFs", mininterval=0.5)
+
+    def _collect(fut, pdf_path: Path):
+        pbar.update()
+        pbar.set_postfix_str(pdf_path.name, refresh=False)
+        try:
+            result = fut.result()
+            if not result:
+                failed_results.append(pdf_path)
+        except Exception as e:
+            logging.error("❌  Error processing future for %s: %s", pdf_path.name, e)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, pbar:
+        # Rolling window: at most 2 × workers tasks are in flight at once, the next
+        # PDF is submitted as one finishes (paths resolved here once, not via lstat
+        # chains in every worker)
+        window = 2 * (workers or available_cpus())
+        pending = {}
+        for pdf in pdf_paths:
+            if len(pending) >= window:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    _collect(fut, pending.pop(fut))
+            pending[pool.submit(grobid_process, pdf, grobid_url, output_dir, full_dump, all_dump,
+                                str(pdf.resolve()))] = pdf
+
+        # Drain the tail as it completes
+        for fut in as_completed(pending):
+            _collect(fut, pending[fut])
 
     return failed_results
 
@@ -43,15 +65,15 @@ def process_results(failed_grobes: List[Path], output_root: Path):
             'title': pdf.name,
             'PDF path': str(pdf)
         })
-    NoGrobjson.write_text(json.dumps(NoGrobes, ensure_ascii=False, indent=2), encoding="utf-8")
+    save_json(NoGrobes, NoGrobjson)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Batch process scholarly PDFs using a GROBID server.")
     parser.add_argument("inputs", nargs="+", help="One or more input PDF files or directories containing PDFs.")
     parser.add_argument("-o", "--output", default="Grob_Outs",
                         help="Output directory to save JSON results. (Default: 'output')")
-    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
-                        help="Number of concurrent worker processes. (Default: 4)")
+    parser.add_argument("-w", "--workers", type=int, default=available_cpus(),
+                        help="Number of concurrent worker processes. (Default: usable CPUs)")
     parser.add_argument("--url", default="http://localhost:8070",
                         help="URL of the running GROBID service. (Default: http://localhost:8070)")
     parser.add_argument("--no-save", action="store_true", help="Do not save individual JSON files for each PDF.")
@@ -70,7 +92,11 @@ if __name__ == "__main__":
     output_root = input_paths[0].parent
     for p in input_paths:
         if p.is_dir():
-            pdf_files.extend(sorted(p.glob("*.pdf")))
+            # one scandir pass, no sort: results complete out of order anyway
+            # (dotfiles included, as glob("*.pdf") does)
+            with os.scandir(p) as it:
+                pdf_files.extend(Path(e.path) for e in it
+                                 if e.name.endswith(".pdf") and e.is_file())
             output_root = p
         elif p.is_file() and p.suffix.lower() == ".pdf":
             pdf_files.append(p)
@@ -84,7 +110,7 @@ if __name__ == "__main__":
     output_path = Path(args.output) if not output_root else output_root/args.output
     logging.info(f"Found {len(pdf_files)} PDF(s) to process. Using {args.workers} worker(s).")
 
-    grob_args = input_paths, output_path, args.workers
+    grob_args = pdf_files, output_path, args.workers
     # Run the batch processing
     #failed_grobes = process_grobids(grob_args)
     process_results(process_grobids(grob_args), output_path)
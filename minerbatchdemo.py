@@ -6,10 +6,10 @@ from magic_pdf.tools.common import batch_do_parse
 
 def batch(pdf_dir, output_dir, method, lang):
     os.makedirs(output_dir, exist_ok=True)
-    doc_paths = []
-    for doc_path in Path(pdf_dir).glob('*'):
-        if doc_path.suffix == '.pdf':
-            doc_paths.append(doc_path)
+    # filter on the dirent name, only PDFs become Path objects
+    with os.scandir(pdf_dir) as it:
+        doc_paths = [Path(e.path) for e in it
+                     if e.name.endswith('.pdf') and e.is_file()]
 
     # build dataset with 2 workers
     datasets = batch_build_dataset(doc_paths, 8, lang)
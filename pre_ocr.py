@@ -1,16 +1,13 @@
-import ocrmypdf, os, time
+import ocrmypdf, io, os, time
 from pathlib import Path
+from typing import BinaryIO
 
-def pre_ocr(pdf_path: Path, out_dir: Path | None = None, workers: int = 8) -> Path:
-    if not out_dir:
-        out_dir = pdf_path.parent
-
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_pdf = out_dir/(pdf_path.stem + "_ocr.pdf")
+def _run_ocr(pdf_path: Path, output: Path | BinaryIO, workers: int = 8) -> None:
+    """OCR pdf_path into output, a path or a writable binary stream."""
     try:
         ocrmypdf.ocr(
             pdf_path,
-            out_pdf,
+            output,
             deskew=True,
             rotate_pages=True,
             progress_bar=True,
@@ -21,25 +18,24 @@ def pre_ocr(pdf_path: Path, out_dir: Path | None = None, workers: int = 8) -> Pa
         # Decide: raise, log, or return original path?
         raise RuntimeError(f"OCR failed for {pdf_path}: {exc}") from exc
 
+def pre_ocr(pdf_path: Path, out_dir: Path | None = None, workers: int = 8) -> Path:
+    if not out_dir:
+        out_dir = pdf_path.parent
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out_pdf = out_dir/(pdf_path.stem + "_ocr.pdf")
+    _run_ocr(pdf_path, out_pdf, workers)
+
     return out_pdf
 
 def _byte_ocr(pdf_path: Path) -> bytes:
     """
-    Return a *searchable* PDF as bytes, deleting the temp copy afterwards.
+    Return a *searchable* PDF as bytes. ocrmypdf writes its output straight into
+    memory, so there is no temp copy to write, read back and delete.
     """
-
-    tmp_dir = pdf_path.parent/"OCRs"
-    tmp_dir.mkdir(exist_ok=True)
-
-    # 1 ─ OCR into tmp_dir to guarantee we never touch the source folder
-    Ocr_pdf = pre_ocr(pdf_path, out_dir=tmp_dir)
-
-    # 2 ─ read bytes; raise if the file somehow vanished
-    pdf_bytes = Ocr_pdf.read_bytes()
-
-    # 3 ─ remove the temp file; swallow 'file missing' only here
-    Ocr_pdf.unlink(missing_ok=True)
-    return pdf_bytes
+    sink = io.BytesIO()
+    _run_ocr(pdf_path, sink)
+    return sink.getvalue()
 
 if __name__ == "__main__":
     overall_start = time.perf_counter()